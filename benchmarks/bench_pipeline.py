@@ -0,0 +1,265 @@
+"""
+bench_pipeline.py
+Headless benchmarks for the sign -> verify -> program -> self-test -> monitor pipeline.
+Reports throughput and p50/p99 latency per operation and writes JSON so results
+can be compared between releases.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pipeline --out bench.json
+    python -m benchmarks.bench_pipeline --quick --time-scale 0.01
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from core.fpga_simulator import FPGASimulator
+from core.keygen_pool import KeyGenPool
+from core.monitor import TelemetryMonitor
+from core.pr_manager import PRManager
+from core.rsa_engine import generate_keys
+from core.signer import sign_file, verify_signature
+from core.trust_cache import VerifiedCache
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_BUDGET_MS = 250  # cold import of main.py, on top of bare interpreter startup
+HEAVY_MODULES = ("cryptography", "numpy", "sklearn", "joblib")
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return None
+    idx = min(len(sorted_vals) - 1, max(0, int(round(pct / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[idx]
+
+
+def measure(name, func, iterations, params=None, items_per_call=1, setup=None):
+    """
+    Run func() `iterations` times (setup() before each call, untimed) and
+    return a result dict with latency percentiles in milliseconds.
+    """
+    func_setup = setup or (lambda: None)
+    times = []
+    for _ in range(iterations):
+        func_setup()
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    total = sum(times)
+    return {
+        "name": name,
+        "params": params or {},
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(times) * 1000,
+        "p50_ms": _percentile(times, 50) * 1000,
+        "p99_ms": _percentile(times, 99) * 1000,
+        "ops_per_s": (iterations * items_per_call) / total if total > 0 else None,
+    }
+
+
+def skipped(name, reason):
+    return {"name": name, "skipped": reason}
+
+
+def bench_startup(iterations, budget_ms=STARTUP_BUDGET_MS):
+    """
+    Cold start: a fresh interpreter importing main.py, minus a bare
+    interpreter start. Also reports which heavy modules got imported.
+    """
+    probe = ("import sys, main; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,))
+
+    def spawn(code):
+        return subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True)
+
+    check = spawn(probe)
+    if check.returncode != 0:
+        err = check.stderr.strip().splitlines()
+        return [skipped("startup", f"cannot import main.py: {err[-1] if err else check.returncode}")]
+    bare = measure("startup[bare]", lambda: spawn("pass"), iterations)
+    result = measure("startup", lambda: spawn("import main"), iterations)
+    import_ms = result["p50_ms"] - bare["p50_ms"]
+    result["params"] = {"import_ms": round(import_ms, 1), "budget_ms": budget_ms}
+    result["heavy_modules"] = [m for m in check.stdout.strip().split(",") if m]
+    result["within_budget"] = import_ms <= budget_ms
+    return [bare, result]
+
+
+def bench_keygen(key_sizes, iterations, workdir):
+    results = []
+    for bits in key_sizes:
+        priv = os.path.join(workdir, f"bench_{bits}_private.pem")
+        pub = os.path.join(workdir, f"bench_{bits}_public.pem")
+        results.append(measure("generate_keys", lambda: generate_keys(priv, pub, bits=bits),
+                               iterations, {"bits": bits}))
+        # hand-out latency from a filled inventory
+        pool = KeyGenPool(bits=bits, inventory_size=iterations).start()
+        pool.get()
+        while pool.stats()["available"] < iterations:
+            time.sleep(0.05)
+        results.append(measure("keygen_pool.get", pool.get, iterations, {"bits": bits, "from_inventory": True}))
+        pool.shutdown()
+    return results
+
+
+def bench_sign_verify(sizes, iterations, workdir, bits):
+    priv = os.path.join(workdir, "private.pem")
+    pub = os.path.join(workdir, "public.pem")
+    generate_keys(priv, pub, bits=bits)
+    results = []
+    for size in sizes:
+        path = os.path.join(workdir, f"bench_{size}.bit")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        sig = sign_file(path, private_key_path=priv)
+        results.append(measure("sign_file", lambda: sign_file(path, private_key_path=priv),
+                               iterations, {"bytes": size, "bits": bits}))
+        results.append(measure("verify_signature", lambda: verify_signature(pub, path, sig),
+                               iterations, {"bytes": size, "bits": bits}))
+    return results
+
+
+def bench_fpga(sizes, iterations, workdir, time_scale):
+    results = []
+    for size in sizes:
+        path = os.path.join(workdir, f"bench_{size}.bit")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+        fpga = FPGASimulator(time_scale=time_scale)
+        quiet = lambda msg: None
+        for delta in (False, True):
+            # delta=True reprograms an identical image, so no frames are written
+            results.append(measure("program_partial",
+                                   lambda: fpga.program_partial(path, log_callback=quiet, delta=delta),
+                                   iterations, {"bytes": size, "time_scale": time_scale, "delta": delta}))
+        # cold readback: drop the cached CRC before every call
+        results.append(measure("readback_crc", fpga.readback_crc, iterations,
+                               {"bytes": size, "cached": False}, setup=fpga._invalidate_crc))
+        fpga.readback_crc()
+        results.append(measure("readback_crc", fpga.readback_crc, iterations,
+                               {"bytes": size, "cached": True}))
+    return results
+
+
+def bench_pipeline(iterations, workdir, time_scale, bits):
+    priv = os.path.join(workdir, "private.pem")
+    pub = os.path.join(workdir, "public.pem")
+    if not os.path.exists(pub):
+        generate_keys(priv, pub, bits=bits)
+    path = os.path.join(workdir, "bench_pipeline.bit")
+    with open(path, "wb") as f:
+        f.write(os.urandom(256 * 1024))
+    sig = sign_file(path, private_key_path=priv)
+    fpga = FPGASimulator(time_scale=time_scale)
+    results = []
+    for cached in (False, True):
+        pr = PRManager(fpga, public_key_path=pub, safe_image=path, log_callback=lambda msg: None,
+                       trust_cache=VerifiedCache(path=None))
+        setup = (lambda: None) if cached else pr.trust_cache.clear
+        results.append(measure("install_and_validate", lambda: pr.install_and_validate(path, sig),
+                               iterations, {"time_scale": time_scale, "cached_verify": cached}, setup=setup))
+    return results
+
+
+def bench_monitor(n_samples, iterations):
+    fpga = FPGASimulator(time_scale=0)
+    samples = [fpga.get_telemetry() for _ in range(n_samples)]
+    results = []
+    modes = [("zscore", False)]
+    from core.monitor import SKLEARN_AVAILABLE
+    if SKLEARN_AVAILABLE:
+        modes.append(("isolationforest", True))
+    else:
+        results.append(skipped("train_baseline[isolationforest]", "scikit-learn not installed"))
+    for label, use_if in modes:
+        monitor = TelemetryMonitor()
+        results.append(measure("train_baseline", lambda: monitor.train_baseline(samples, use_isolationforest=use_if),
+                               iterations, {"model": label, "samples": n_samples}))
+        one = samples[0]
+        results.append(measure("is_anomaly", lambda: monitor.is_anomaly(one), iterations * 10,
+                               {"model": label}))
+        X = monitor.to_array(samples)
+        results.append(measure("score_batch", lambda: monitor.score_batch(X), iterations,
+                               {"model": label, "batch": n_samples}, items_per_call=n_samples))
+    monitor = TelemetryMonitor()
+    monitor.start_online(samples[0].keys(), samples=samples)
+    one = samples[0]
+    results.append(measure("observe", lambda: monitor.observe(one), iterations * 10, {"model": "online"}))
+    return results
+
+
+def run(args):
+    key_sizes = [int(b) for b in args.key_sizes.split(",") if b]
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = []
+    results += bench_startup(max(3, args.iterations // 2), args.startup_budget_ms)
+    with tempfile.TemporaryDirectory(prefix="fpga_bench_") as workdir:
+        results += bench_keygen(key_sizes, args.keygen_iterations, workdir)
+        results += bench_sign_verify(sizes, args.iterations, workdir, args.bits)
+        results += bench_fpga(sizes, args.iterations, workdir, args.time_scale)
+        results += bench_pipeline(max(1, args.iterations // 2), workdir, args.time_scale, args.bits)
+        results += bench_monitor(args.samples, args.iterations)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "time_scale": args.time_scale,
+        },
+        "results": results,
+    }
+
+
+def format_table(report):
+    lines = [f"{'benchmark':<24} {'params':<40} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>12}"]
+    for r in report["results"]:
+        if "skipped" in r:
+            lines.append(f"{r['name']:<24} SKIPPED: {r['skipped']}")
+            continue
+        params = ",".join(f"{k}={v}" for k, v in r["params"].items())
+        ops = f"{r['ops_per_s']:.1f}" if r["ops_per_s"] else "-"
+        lines.append(f"{r['name']:<24} {params:<40} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {ops:>12}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the secure reconfiguration pipeline.")
+    parser.add_argument("--out", help="write JSON results to this path")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--keygen-iterations", type=int, default=3)
+    parser.add_argument("--key-sizes", default="2048,3072")
+    parser.add_argument("--bits", type=int, default=3072, help="key size for sign/verify benchmarks")
+    parser.add_argument("--sizes", default="4096,1048576,16777216", help="bitstream sizes in bytes")
+    parser.add_argument("--samples", type=int, default=1000, help="telemetry samples for monitor benchmarks")
+    parser.add_argument("--time-scale", type=float, default=0.0,
+                        help="scale for simulated programming/self-test delays (0 disables them)")
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="fail (exit 3) if importing main.py takes longer than this")
+    parser.add_argument("--quick", action="store_true", help="small sizes and few iterations (smoke run)")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.iterations, args.keygen_iterations = 5, 1
+        args.key_sizes, args.bits, args.sizes, args.samples = "2048", 2048, "4096,65536", 200
+
+    report = run(args)
+    print(format_table(report))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+    over = [r for r in report["results"] if r.get("within_budget") is False]
+    for r in over:
+        print(f"Startup budget exceeded: {r['params']['import_ms']} ms > {r['params']['budget_ms']} ms "
+              f"(heavy modules loaded: {', '.join(r['heavy_modules']) or 'none'})")
+    return 3 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
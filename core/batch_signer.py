@@ -0,0 +1,120 @@
+"""
+batch_signer.py
+Headless batch signing / verification of many bitstreams across a process pool.
+Results are yielded as each file finishes and can be written to a JSON report.
+
+Usage:
+    python -m core.batch_signer sign data/release --key data/private.pem
+    python -m core.batch_signer verify manifest.txt --key data/public.pem --report report.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.signer import sign_file, verify_signature
+
+BITSTREAM_EXTENSIONS = (".bit", ".bin", ".pbit")
+
+
+def collect_bitstreams(source, extensions=BITSTREAM_EXTENSIONS):
+    """
+    source: directory (searched recursively for bitstream extensions) or a
+    manifest file (JSON list of paths, or one path per line; '#' starts a comment).
+    Relative manifest entries are resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for dirpath, _, filenames in os.walk(source):
+            for name in filenames:
+                if name.lower().endswith(extensions):
+                    paths.append(os.path.join(dirpath, name))
+        return sorted(paths)
+    with open(source, "r") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [line.split("#", 1)[0].strip() for line in text.splitlines()]
+    base = os.path.dirname(os.path.abspath(source))
+    return [e if os.path.isabs(e) else os.path.join(base, e) for e in entries if e]
+
+
+def _sign_one(path, private_key_path):
+    t0 = time.perf_counter()
+    try:
+        sig = sign_file(path, private_key_path=private_key_path)
+        return {"path": path, "ok": True, "message": f"Signed -> {sig}", "seconds": time.perf_counter() - t0}
+    except Exception as e:
+        return {"path": path, "ok": False, "message": f"Signing failed: {e}", "seconds": time.perf_counter() - t0}
+
+
+def _verify_one(path, public_key_path):
+    t0 = time.perf_counter()
+    ok, msg = verify_signature(public_key_path, path, path + ".sig")
+    return {"path": path, "ok": ok, "message": msg, "seconds": time.perf_counter() - t0}
+
+
+def run_batch(mode, paths, key_path, workers=None):
+    """
+    Sign or verify every path in a process pool (one worker per core by default).
+    Yields one result dict per file, in completion order.
+    """
+    if mode not in ("sign", "verify"):
+        raise ValueError(f"Unknown batch mode: {mode}")
+    func = _sign_one if mode == "sign" else _verify_one
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, p, key_path) for p in paths]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+
+def summarize(mode, results, elapsed):
+    ok = sum(1 for r in results if r["ok"])
+    return {
+        "mode": mode,
+        "total": len(results),
+        "ok": ok,
+        "failed": len(results) - ok,
+        "elapsed_seconds": round(elapsed, 4),
+        "files_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+        "results": sorted(results, key=lambda r: r["path"]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch sign or verify FPGA bitstreams.")
+    parser.add_argument("mode", choices=["sign", "verify"])
+    parser.add_argument("source", help="directory of bitstreams or manifest file")
+    parser.add_argument("--key", help="private key (sign) or public key (verify)")
+    parser.add_argument("--workers", type=int, default=None, help="process count (default: all cores)")
+    parser.add_argument("--report", help="write JSON summary report to this path")
+    args = parser.parse_args(argv)
+
+    key = args.key or ("data/private.pem" if args.mode == "sign" else "data/public.pem")
+    paths = collect_bitstreams(args.source)
+    if not paths:
+        print(f"[Batch] No bitstreams found in {args.source}")
+        return 1
+
+    print(f"[Batch] {args.mode}: {len(paths)} file(s)")
+    t0 = time.perf_counter()
+    results = []
+    for r in run_batch(args.mode, paths, key, workers=args.workers):
+        results.append(r)
+        status = "OK  " if r["ok"] else "FAIL"
+        print(f"[Batch] {status} {r['path']} ({r['seconds']*1000:.1f} ms) {r['message']}", flush=True)
+    summary = summarize(args.mode, results, time.perf_counter() - t0)
+    print(f"[Batch] Done: {summary['ok']}/{summary['total']} ok in {summary['elapsed_seconds']}s")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"[Batch] Report written to {args.report}")
+    return 0 if summary["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+bundle.py
+Signed bundles: one manifest listing the SHA-256 digest and size of every
+bitstream in a release, signed once with RSA-PSS (<manifest>.sig).
+A device verifies the manifest with a single RSA operation and then checks
+each member by hash only when it is actually installed.
+
+Usage:
+    python -m core.bundle sign data/release --key data/private.pem --out data/release/bundle.json
+    python -m core.bundle verify data/release/bundle.json --key data/public.pem
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.signer import CHUNK_SIZE, hash_file, sign_file, verify_digest
+
+BUNDLE_FORMAT = "bitstream-bundle"
+BUNDLE_VERSION = 1
+
+
+def build_manifest(paths, manifest_path, workers=None):
+    """
+    Manifest dict for the given bitstreams. Member names are relative to the
+    manifest's directory, so the release directory can be moved as a whole.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    paths = [os.path.abspath(p) for p in paths]
+    # hashlib releases the GIL on large buffers, so threads hash in parallel
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(hash_file, paths))
+    members = {}
+    for path, digest in zip(paths, digests):
+        name = os.path.relpath(path, base).replace(os.sep, "/")
+        members[name] = {"sha256": digest.hex(), "size": os.path.getsize(path)}
+    return {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "members": members}
+
+
+def sign_bundle(paths, manifest_path, private_key_path="data/private.pem", workers=None):
+    """Write the manifest and its detached signature; returns (manifest_path, sig_path)."""
+    manifest = build_manifest(paths, manifest_path, workers)
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest_path, sign_file(manifest_path, private_key_path=private_key_path)
+
+
+class SignedBundle:
+    """
+    A manifest whose signature has been verified. Use SignedBundle.load();
+    member checks then cost one SHA-256 of the member file and no RSA work.
+    """
+    def __init__(self, manifest_path, manifest):
+        self.path = manifest_path
+        self.base = os.path.dirname(os.path.abspath(manifest_path))
+        self.members = manifest["members"]
+        self.created = manifest.get("created")
+
+    @classmethod
+    def load(cls, manifest_path, public_key_path="data/public.pem", sig_path=None):
+        """
+        Verify and parse a manifest. Returns (bundle, msg); bundle is None if
+        the manifest is missing, malformed or its signature does not verify.
+        """
+        sig_path = sig_path or manifest_path + ".sig"
+        if not (os.path.exists(public_key_path) and os.path.exists(manifest_path) and os.path.exists(sig_path)):
+            return None, "Missing public key / manifest / signature file."
+        # parse exactly the bytes that were verified
+        with open(manifest_path, "rb") as f:
+            data = f.read()
+        with open(sig_path, "rb") as f:
+            signature = f.read()
+        ok, msg = verify_digest(public_key_path, hashlib.sha256(data).digest(), signature)
+        if not ok:
+            return None, f"Manifest {msg[0].lower()}{msg[1:]}"
+        try:
+            manifest = json.loads(data)
+        except ValueError as e:
+            return None, f"Manifest is not valid JSON: {e}"
+        if manifest.get("format") != BUNDLE_FORMAT or manifest.get("version") != BUNDLE_VERSION:
+            return None, "Unsupported manifest format."
+        bundle = cls(manifest_path, manifest)
+        return bundle, f"Manifest signature valid ({len(bundle.members)} member(s))."
+
+    def member_name(self, bitstream_path):
+        name = os.path.relpath(os.path.abspath(bitstream_path), self.base).replace(os.sep, "/")
+        return name if name in self.members else None
+
+    def __contains__(self, bitstream_path):
+        return self.member_name(bitstream_path) is not None
+
+    def __len__(self):
+        return len(self.members)
+
+    def check_member(self, bitstream_path, chunk_size=CHUNK_SIZE):
+        """
+        Same contract as core.signer.verify_signature: returns (ok, msg).
+        The member is re-hashed on every call; file metadata is not trusted.
+        """
+        name = self.member_name(bitstream_path)
+        if name is None:
+            return False, f"{os.path.basename(bitstream_path)} is not listed in manifest {self.path}."
+        entry = self.members[name]
+        try:
+            size = os.path.getsize(bitstream_path)
+            if size != entry["size"]:
+                return False, f"Member {name} size mismatch (manifest {entry['size']}, file {size})."
+            digest = hash_file(bitstream_path, chunk_size).hex()
+        except Exception as e:
+            return False, f"Member check failed: {e}"
+        if digest != entry["sha256"]:
+            return False, f"Member {name} digest does not match signed manifest."
+        return True, f"Member {name} matches signed manifest."
+
+    def check_all(self):
+        """[(name, ok, msg)] for every member."""
+        return [(name, *self.check_member(os.path.join(self.base, name))) for name in sorted(self.members)]
+
+
+def main(argv=None):
+    from core.batch_signer import collect_bitstreams
+
+    parser = argparse.ArgumentParser(description="Create or verify a signed bitstream bundle.")
+    parser.add_argument("mode", choices=["sign", "verify"])
+    parser.add_argument("source", help="sign: directory or path list of bitstreams; verify: manifest file")
+    parser.add_argument("--key", help="private key (sign) or public key (verify)")
+    parser.add_argument("--out", help="manifest path (sign; default <source>/bundle.json)")
+    args = parser.parse_args(argv)
+
+    if args.mode == "sign":
+        key = args.key or "data/private.pem"
+        paths = collect_bitstreams(args.source)
+        if not paths:
+            print(f"[Bundle] No bitstreams found in {args.source}")
+            return 1
+        out = args.out or os.path.join(args.source if os.path.isdir(args.source)
+                                       else os.path.dirname(args.source), "bundle.json")
+        t0 = time.perf_counter()
+        manifest_path, sig_path = sign_bundle(paths, out, private_key_path=key)
+        print(f"[Bundle] Signed {len(paths)} bitstream(s) -> {manifest_path} + {sig_path} "
+              f"in {time.perf_counter() - t0:.2f}s")
+        return 0
+
+    bundle, msg = SignedBundle.load(args.source, public_key_path=args.key or "data/public.pem")
+    print(f"[Bundle] {msg}")
+    if bundle is None:
+        return 2
+    failed = 0
+    for name, ok, msg in bundle.check_all():
+        print(f"[Bundle] {'OK  ' if ok else 'FAIL'} {name} {msg}")
+        failed += not ok
+    print(f"[Bundle] Done: {len(bundle) - failed}/{len(bundle)} ok")
+    return 0 if failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+explain_module.py
+Plain-language explanations shown in the GUI console for each step of the
+pipeline. Texts are fixed templates filled with str.format, so this module
+imports nothing heavy and costs nothing at startup.
+"""
+import os
+
+KEYGEN_TEMPLATE = """=== RSA Key Generation Explanation ===
+RSA is an asymmetric cryptographic algorithm using a key pair:
+  • Private Key (kept secret): used to create digital signatures and decrypt (when used).
+  • Public Key (shared): used to verify signatures and encrypt for the holder of the private key.
+
+Why we generate keys for this prototype:
+  • Sign bitstream files using the private key so devices can ensure authenticity.
+  • Embed or store the public key on the device (or a trusted location) to verify signatures.
+
+Where each key is used in the system:
+  • Private Key -> Signing tool (manufacturer/secure server). NEVER stored on the FPGA or in untrusted storage.
+  • Public Key  -> Stored on the device (FPGA SoC) to verify incoming bitstreams before applying them.
+
+Saved to: Private -> {private_path}; Public -> {public_path}
+Security confirmation:
+  • Keep the private key offline; rotate keys if compromised; use hardware-backed key storage on real devices."""
+
+SIGNING_TEMPLATE = """=== Bitstream Signing Explanation ===
+File: {name}
+  • The bitstream is hashed with SHA-256 (read in 1 MiB chunks, so size does not matter).
+  • The digest is signed with the private key using RSA-PSS.
+  • The signature is saved next to the file: {sig_path}
+Ship the bitstream together with its .sig; the device checks both before programming."""
+
+VERIFICATION_TEMPLATE = """=== Signature Verification Explanation ===
+File: {name}
+  • The device re-computes the SHA-256 digest of the bitstream.
+  • The public key checks that {sig_name} was made over that digest by the matching private key.
+  • Any change to the bitstream or the signature makes verification fail, and the
+    bitstream is rejected before it reaches the FPGA."""
+
+RECONFIGURATION_TEMPLATE = """=== Partial Reconfiguration ===
+Installing {name}:
+  1. Verify the signature (or the signed bundle manifest) before touching the device.
+  2. Program only the partial region; the rest of the FPGA keeps running.
+  3. Run a self-test on the new module.
+  4. Roll back to the trusted safe image if any step fails."""
+
+
+def explain_keygen(private_path="data/private.pem", public_path="data/public.pem"):
+    """
+    Return a human-friendly explanation about key generation and what each key is used for.
+    """
+    return KEYGEN_TEMPLATE.format(private_path=private_path, public_path=public_path)
+
+
+def explain_signing(bitstream_path, sig_path):
+    return SIGNING_TEMPLATE.format(name=os.path.basename(bitstream_path), sig_path=sig_path)
+
+
+def explain_verification(bitstream_path, sig_path):
+    return VERIFICATION_TEMPLATE.format(name=os.path.basename(bitstream_path),
+                                        sig_name=os.path.basename(sig_path))
+
+
+def explain_reconfiguration(bitstream_path):
+    return RECONFIGURATION_TEMPLATE.format(name=os.path.basename(bitstream_path))
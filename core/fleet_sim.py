@@ -0,0 +1,269 @@
+"""
+fleet_sim.py
+Deterministic, faster-than-real-time simulation of FPGASimulator fleets.
+Every device gets its own seeded RNG and a VirtualClock; a single-threaded
+discrete-event loop runs installs, rollbacks and monitoring polls in
+simulated-time order. The same seed always gives the same results, and an
+hour of fleet time takes seconds of wall time.
+
+Usage:
+    python -m core.fleet_sim --devices 1000 --hours 1 --seed 7
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core.fpga_simulator import FPGASimulator
+
+
+class VirtualClock:
+    """Simulated time in seconds; sleep() advances it instantly."""
+    def __init__(self, start=0.0):
+        self.t = float(start)
+
+    def now(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.t += seconds
+
+    def advance_to(self, t):
+        if t > self.t:
+            self.t = t
+
+
+class SimDevice:
+    def __init__(self, index, name, fpga, pr):
+        self.index = index
+        self.name = name
+        self.fpga = fpga
+        self.pr = pr
+        self.rolling_back = False
+        self.samples = 0
+        self.installs = 0
+        self.install_failures = 0
+        self.anomalies = 0
+        self.rollbacks = 0
+
+    def busy(self, t):
+        # the device clock runs ahead of the fleet while an operation is in progress
+        return self.fpga.clock.now() > t
+
+
+class FleetSimulation:
+    def __init__(self, n_devices, safe_image, public_key_path="data/public.pem", seed=0,
+                 poll_interval=1.0, monitor=None, trust_cache=None, log_callback=None):
+        """
+        seed: seeds every device RNG ("<seed>/<device>") and the scenario RNG.
+        monitor: TelemetryMonitor shared by the fleet (default: an online
+        baseline learned during the first polls, as in MonitorService).
+        """
+        from core.pr_manager import PRManager
+        from core.trust_cache import VerifiedCache
+
+        self.seed = seed
+        self.rng = random.Random(f"{seed}/scenario")
+        self.safe_image = safe_image
+        self.poll_interval = poll_interval
+        self.monitor = monitor
+        self.log = log_callback or (lambda msg: None)
+        self.trust_cache = trust_cache if trust_cache is not None else VerifiedCache(path=None)
+        self.now = 0.0
+        self._events = []
+        self._seq = itertools.count()
+        self.recovery_times = []
+        quiet = lambda msg: None
+        self.devices = []
+        for i in range(n_devices):
+            name = f"dev{i}"
+            fpga = FPGASimulator(pr_region=f"{name}/PR0", seed=f"{seed}/{name}", clock=VirtualClock())
+            pr = PRManager(fpga, public_key_path=public_key_path, safe_image=safe_image, log_callback=quiet,
+                           trust_cache=self.trust_cache, background_restage=False)
+            self.devices.append(SimDevice(i, name, fpga, pr))
+
+    # scenario building
+
+    def schedule(self, t, kind, device=None, *args):
+        heapq.heappush(self._events, (t, next(self._seq), kind, device, args))
+
+    def bring_up(self, t=0.0, prestage=True):
+        """Program the safe image everywhere (and prestage it for fast rollback)."""
+        for i in range(len(self.devices)):
+            self.schedule(t, "bring_up", i, prestage)
+
+    def install(self, t, device, image, sig_path=None):
+        self.schedule(t, "install", device, image, sig_path)
+
+    def rollout(self, image, start=0.0, window=0.0, sig_path=None, devices=None):
+        """Install image on the given devices (default all), spread evenly over window seconds."""
+        devices = list(range(len(self.devices))) if devices is None else list(devices)
+        step = window / len(devices) if devices else 0.0
+        for k, i in enumerate(devices):
+            self.install(start + k * step, i, image, sig_path)
+
+    def inject(self, t, device, image):
+        """Load an image without any signature check (fault / attack)."""
+        self.schedule(t, "inject", device, image)
+
+    def inject_random(self, image, count, start, end):
+        """Inject image into `count` devices chosen by the scenario RNG at random times."""
+        for i in self.rng.sample(range(len(self.devices)), min(count, len(self.devices))):
+            self.inject(self.rng.uniform(start, end), i, image)
+
+    def start_monitoring(self, t=0.0):
+        self.schedule(t, "poll")
+
+    # event loop
+
+    def run(self, until):
+        """Process events in time order up to simulated time `until`; returns summary()."""
+        started = time.perf_counter()
+        while self._events and self._events[0][0] <= until:
+            t, _, kind, device, args = heapq.heappop(self._events)
+            self.now = t
+            getattr(self, f"_on_{kind}")(t, device, *args)
+        self.now = max(self.now, until)
+        self.wall_seconds = time.perf_counter() - started
+        return self.summary()
+
+    def _device(self, t, i):
+        dev = self.devices[i]
+        # operations on a busy device queue behind the running one
+        dev.fpga.clock.advance_to(t)
+        return dev
+
+    def _on_bring_up(self, t, i, prestage):
+        dev = self._device(t, i)
+        dev.fpga.program_partial(self.safe_image, log_callback=dev.pr.log)
+        if prestage:
+            dev.pr.prestage_safe_image()
+
+    def _on_install(self, t, i, image, sig_path):
+        dev = self._device(t, i)
+        dev.installs += 1
+        if not dev.pr.install_and_validate(image, sig_path):
+            dev.install_failures += 1
+
+    def _on_inject(self, t, i, image):
+        dev = self._device(t, i)
+        dev.fpga.program_partial(image, log_callback=dev.pr.log)
+        self.log(f"[FleetSim] t={t:.1f}s {dev.name}: injected {os.path.basename(image)}")
+
+    def _on_rollback(self, t, i, detected_at):
+        dev = self._device(t, i)
+        ok = dev.pr.rollback(detected_at=detected_at)
+        dev.rollbacks += 1
+        dev.rolling_back = False
+        if ok and dev.pr.last_recovery_seconds is not None:
+            self.recovery_times.append(dev.pr.last_recovery_seconds)
+        self.log(f"[FleetSim] t={t:.1f}s {dev.name}: rollback {'ok' if ok else 'FAILED'}")
+
+    def _on_poll(self, t, _device):
+        from core.monitor import TelemetryMonitor
+
+        idle = [dev for dev in self.devices if not dev.rolling_back and not dev.busy(t)]
+        if idle:
+            samples = [dev.fpga.get_telemetry() for dev in idle]
+            if self.monitor is None:
+                self.monitor = TelemetryMonitor()
+            if self.monitor.online is None and self.monitor.model is None and self.monitor.mean is None:
+                self.monitor.start_online(samples[0].keys())
+            X = self.monitor.to_array(samples)
+            flags, _ = self.monitor.score_batch(X)
+            if self.monitor.online is not None:
+                self.monitor.online.update_batch(X[~flags])
+            for dev, flag in zip(idle, flags):
+                dev.samples += 1
+                if flag:
+                    dev.anomalies += 1
+                    dev.rolling_back = True
+                    self.schedule(t, "rollback", dev.index, t)
+        self.schedule(t + self.poll_interval, "poll")
+
+    # results
+
+    def summary(self):
+        ttr = sorted(self.recovery_times)
+
+        def pct(q):
+            return round(ttr[min(len(ttr) - 1, int(q / 100.0 * len(ttr)))] * 1000, 1) if ttr else None
+
+        busy = sum(dev.fpga.busy_seconds for dev in self.devices)
+        sim = self.now
+        wall = getattr(self, "wall_seconds", None)
+        return {
+            "seed": self.seed,
+            "devices": len(self.devices),
+            "simulated_seconds": round(sim, 3),
+            "wall_seconds": round(wall, 3) if wall is not None else None,
+            "speedup": round(sim / wall, 1) if wall else None,
+            "samples": sum(d.samples for d in self.devices),
+            "installs": sum(d.installs for d in self.devices),
+            "install_failures": sum(d.install_failures for d in self.devices),
+            "anomalies": sum(d.anomalies for d in self.devices),
+            "rollbacks": sum(d.rollbacks for d in self.devices),
+            "program_count": sum(d.fpga.program_count for d in self.devices),
+            "time_to_recovery_ms": {"p50": pct(50), "p99": pct(99), "max": pct(100)},
+            "device_busy_fraction": round(busy / (sim * len(self.devices)), 4) if sim and self.devices else None,
+        }
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def main(argv=None):
+    from core.rsa_engine import generate_keys
+    from core.signer import sign_file
+
+    parser = argparse.ArgumentParser(description="Deterministic FPGA fleet rollout / rollback simulation.")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--hours", type=float, default=1.0, help="simulated duration")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="monitoring poll interval (simulated s)")
+    parser.add_argument("--rollout-at", type=float, default=60.0, help="start of the update rollout (simulated s)")
+    parser.add_argument("--rollout-window", type=float, default=600.0, help="rollout spread (simulated s)")
+    parser.add_argument("--attacks", type=int, default=10, help="devices that get a bad module injected")
+    parser.add_argument("--image-kib", type=int, default=64, help="size of the generated images")
+    parser.add_argument("--out", help="write the JSON summary to this path")
+    args = parser.parse_args(argv)
+
+    duration = args.hours * 3600
+    with tempfile.TemporaryDirectory(prefix="fleet_sim_") as workdir:
+        # scenario inputs are derived from the seed too, so runs are repeatable end to end
+        rng = random.Random(f"{args.seed}/images")
+        size = args.image_kib * 1024
+        priv, pub = generate_keys(os.path.join(workdir, "private.pem"), os.path.join(workdir, "public.pem"), bits=2048)
+        safe = _write(os.path.join(workdir, "safe_module.bit"), rng.randbytes(size))
+        update = _write(os.path.join(workdir, "module_v2.bit"), rng.randbytes(size))
+        bad = _write(os.path.join(workdir, "bad_module.bit"), b"BAD_MODULE_V1" * (size // 13))
+        sign_file(safe, private_key_path=priv)
+        sign_file(update, private_key_path=priv)
+
+        sim = FleetSimulation(args.devices, safe, public_key_path=pub, seed=args.seed,
+                              poll_interval=args.poll_interval)
+        sim.bring_up()
+        sim.start_monitoring(0.0)
+        sim.rollout(update, start=args.rollout_at, window=args.rollout_window)
+        sim.inject_random(bad, args.attacks, args.rollout_at, duration)
+        print(f"[FleetSim] {args.devices} device(s), {args.hours}h simulated, seed {args.seed}")
+        summary = sim.run(duration)
+
+    print(json.dumps(summary, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"[FleetSim] Summary written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
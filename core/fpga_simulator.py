@@ -1,34 +1,203 @@
-
+import hashlib
 import os
 import time
 import zlib
 import random
+from array import array
+
+from core.metrics import metrics
+
+FRAME_SIZE = 404  # bytes per configuration frame (101 32-bit words, as on 7-series parts)
+CHUNK_FRAMES = 2048  # frames read per chunk while programming / reading back
+FRAME_DIGEST_SIZE = 16  # BLAKE2b digest per frame, used to diff images (CRC32 is too weak for that)
+PROGRAM_SETUP_TIME = 0.05  # fixed cost (s) of any reconfiguration, on top of per-frame time
+
+
+def _file_stat(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
 
 class FPGASimulator:
-    def __init__(self, pr_region="PR0"):
+    def __init__(self, pr_region="PR0", track_frames=True, time_scale=1.0, seed=None, clock=None):
+        """
+        seed: seeds this device's own RNG (telemetry, programming time,
+        transient self-test faults), so runs are reproducible per device.
+        clock: optional virtual clock (now() / sleep(seconds)); simulated
+        delays then advance it instead of sleeping. See core.fleet_sim.
+        """
         self.current_image = None
+        self.track_frames = track_frames
+        # multiplier for simulated delays: 1.0 = real time, 0 = no delays (benchmarks)
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.busy_seconds = 0.0  # simulated time spent in delays (unscaled)
         self.pr_region = pr_region
         self.program_count = 0
         self._state = {}
+        # readback cache for the loaded image: stat signature, whole-image CRC, per-frame CRCs
+        self._crc_stat = None
+        self._crc = None
+        self._frame_crcs = None
+        # per-frame digests of the programmed image, for delta programming
+        self._frame_digests = None
+        self.last_changed_frames = []
+        # standby copy of an image (e.g. the safe image) for fast switch-over
+        self._shadow = None
 
-    def program_partial(self, bitstream_path, log_callback=print):
+    @metrics.timed("fpga.program_partial")
+    def program_partial(self, bitstream_path, log_callback=print, delta=True):
+        """
+        Program a bitstream into the region. With delta=True (and frame
+        tracking on) only frames that differ from the loaded image are
+        written, and simulated programming time scales with their number.
+        """
         if not os.path.exists(bitstream_path):
             log_callback(f"[FPGA] ERROR: Bitstream not found: {bitstream_path}")
             return False
         log_callback(f"[FPGA] Programming {bitstream_path} into region {self.pr_region} ...")
-        # simulate programming time
-        time.sleep(1.0 + random.random()*0.8)
+        old_digests = self._frame_digests if delta and self.current_image is not None else None
+        self._invalidate_crc()
+        # a full-region reload takes this long; each written frame costs its share
+        duration = 1.0 + self.rng.random()*0.8
+        stat = _file_stat(bitstream_path)
+        n_frames = -(-stat[1] // FRAME_SIZE)
+        old_frames = len(old_digests) // FRAME_DIGEST_SIZE if old_digests is not None else 0
+        # the region spans whichever image is larger; a full reload of it takes `duration`
+        frame_time = duration / max(n_frames, old_frames, 1)
+        changed = []
+
+        def on_chunk(first, count, digests):
+            # frames are diffed and "written" chunk by chunk while the CRC streams in
+            if old_digests is None or digests is None:
+                written = range(first, first + count)
+            else:
+                d = FRAME_DIGEST_SIZE
+                written = [first + i for i in range(count)
+                           if old_digests[(first + i) * d:(first + i + 1) * d] != digests[i * d:(i + 1) * d]]
+            changed.extend(written)
+            self.delay(frame_time * len(written))
+
+        self.delay(PROGRAM_SETUP_TIME)
+        crc, frame_crcs, frame_digests = self._stream_frames(bitstream_path, self.track_frames, on_chunk)
+        if old_digests is not None:
+            # frames past the end of a shorter image get cleared
+            cleared = range(n_frames, old_frames)
+            changed.extend(cleared)
+            self.delay(frame_time * len(cleared))
         self.current_image = bitstream_path
         self.program_count += 1
+        self._crc_stat, self._crc, self._frame_crcs = stat, crc, frame_crcs
+        self._frame_digests = frame_digests
+        self.last_changed_frames = changed
+        if old_digests is not None:
+            log_callback(f"[FPGA] Delta programming: wrote {len(changed)} changed frame(s); image has {n_frames}.")
+        # per-frame readback of what was just written
+        bad = self.verify_frames([f for f in changed if f < n_frames])
+        if bad:
+            log_callback(f"[FPGA] ERROR: Readback mismatch in {len(bad)} frame(s) (first: {bad[0]}).")
+            return False
         log_callback("[FPGA] Programming complete.")
         return True
 
+    def stage_shadow(self, bitstream_path, log_callback=print):
+        """
+        Load an image into the shadow (standby) region. Costs a full
+        programming pass but leaves the active image untouched.
+        """
+        if not os.path.exists(bitstream_path):
+            log_callback(f"[FPGA] ERROR: Bitstream not found: {bitstream_path}")
+            return False
+        duration = 1.0 + self.rng.random()*0.8
+        stat = _file_stat(bitstream_path)
+        frame_time = duration / max(-(-stat[1] // FRAME_SIZE), 1)
+        crc, frame_crcs, frame_digests = self._stream_frames(
+            bitstream_path, self.track_frames, lambda first, count, digests: self.delay(frame_time * count))
+        self._shadow = {"path": bitstream_path, "stat": stat, "crc": crc,
+                        "frame_crcs": frame_crcs, "frame_digests": frame_digests}
+        log_callback(f"[FPGA] Staged {bitstream_path} in shadow region of {self.pr_region}.")
+        return True
+
+    def shadow_image(self):
+        """Path of the staged shadow image, or None if nothing valid is staged."""
+        sh = self._shadow
+        if sh is None or not os.path.exists(sh["path"]) or _file_stat(sh["path"]) != sh["stat"]:
+            return None
+        return sh["path"]
+
+    def switch_to_shadow(self, log_callback=print):
+        """
+        Fast path: make the shadow region active. Only the switch-over cost is
+        paid, and the CRC tables captured at staging time become the readback cache.
+        """
+        if self.shadow_image() is None:
+            log_callback("[FPGA] No valid shadow image staged.")
+            return False
+        sh, self._shadow = self._shadow, None
+        self.delay(PROGRAM_SETUP_TIME)
+        self.current_image = sh["path"]
+        self.program_count += 1
+        self._crc_stat, self._crc, self._frame_crcs = sh["stat"], sh["crc"], sh["frame_crcs"]
+        self._frame_digests = sh["frame_digests"]
+        self.last_changed_frames = []
+        log_callback(f"[FPGA] Switched region {self.pr_region} to shadow image {sh['path']}.")
+        return True
+
+    def delay(self, seconds):
+        """
+        Spend a simulated duration: advances the virtual clock if there is
+        one, otherwise sleeps for seconds * time_scale.
+        """
+        self.busy_seconds += seconds
+        if self.clock is not None:
+            self.clock.sleep(seconds)
+        elif self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def now(self):
+        """Current time in seconds: virtual clock time, or time.perf_counter()."""
+        return self.clock.now() if self.clock is not None else time.perf_counter()
+
     def readback_crc(self):
         if self.current_image is None:
             return None
-        data = open(self.current_image, "rb").read()
-        return zlib.crc32(data) & 0xffffffff
+        if self._crc is None or _file_stat(self.current_image) != self._crc_stat:
+            self._refresh_crc()
+        return self._crc
+
+    def frame_crcs(self):
+        """Per-frame CRC32 table captured when the image was programmed, or None if track_frames is off."""
+        return self._frame_crcs
+
+    def verify_frames(self, frames=None):
+        """
+        Partial readback: re-read only the given frame indices (all frames if
+        None) and compare them with the CRC table captured at programming time.
+        Returns the list of frame indices whose contents changed.
+        """
+        if self.current_image is None or self._frame_crcs is None:
+            return []
+        table = self._frame_crcs
+        frames = range(len(table)) if frames is None else frames
+        indices = sorted(i for i in set(frames) if 0 <= i < len(table))
+        bad = []
+        with open(self.current_image, "rb") as f:
+            # read runs of consecutive frames with one seek each
+            start = 0
+            while start < len(indices):
+                end = start
+                while end + 1 < len(indices) and indices[end + 1] == indices[end] + 1 and end - start < CHUNK_FRAMES:
+                    end += 1
+                f.seek(indices[start] * FRAME_SIZE)
+                data = f.read((end - start + 1) * FRAME_SIZE)
+                for k, idx in enumerate(indices[start:end + 1]):
+                    if zlib.crc32(data[k * FRAME_SIZE:(k + 1) * FRAME_SIZE]) & 0xffffffff != table[idx]:
+                        bad.append(idx)
+                start = end + 1
+        return bad
 
+    @metrics.timed("fpga.self_test")
     def self_test(self, log_callback=print):
         # simulate self-test using CRC: certain CRC residues simulate failure
         crc = self.readback_crc()
@@ -36,7 +205,7 @@ class FPGASimulator:
             log_callback("[FPGA] Self-test: no image loaded.")
             return False
         # transient random failure
-        if random.randint(0, 49) == 0:
+        if self.rng.randint(0, 49) == 0:
             log_callback("[FPGA] Self-test: TRANSIENT ERROR")
             return False
         if crc % 17 == 0:
@@ -49,13 +218,56 @@ class FPGASimulator:
         # Return simulated telemetry values: packet_rate, errors, cpu_load
         base = 1000
         if self.current_image and "stress" in os.path.basename(self.current_image).lower():
-            base += random.randint(0, 300)
+            base += self.rng.randint(0, 300)
         if self.current_image and "bad" in os.path.basename(self.current_image).lower():
-            errors = random.randint(10, 60)
+            errors = self.rng.randint(10, 60)
             packet_rate = base // 4
-            cpu = random.randint(50, 95)
+            cpu = self.rng.randint(50, 95)
         else:
-            errors = random.randint(0, 2)
-            packet_rate = base + random.randint(-10, 10)
-            cpu = random.randint(5, 30)
+            errors = self.rng.randint(0, 2)
+            packet_rate = base + self.rng.randint(-10, 10)
+            cpu = self.rng.randint(5, 30)
         return {"packet_rate": packet_rate, "errors": errors, "cpu": cpu}
+
+    def _invalidate_crc(self):
+        self._crc_stat = self._crc = self._frame_crcs = None
+        self._frame_digests = None
+
+    def _refresh_crc(self):
+        # the image changed on disk: re-read it in chunks. The per-frame table
+        # keeps describing what was programmed, so verify_frames can locate the change.
+        stat = _file_stat(self.current_image)
+        self._crc, _, _ = self._stream_frames(self.current_image, track_frames=False)
+        self._crc_stat = stat
+
+    @staticmethod
+    def _stream_frames(path, track_frames=True, on_chunk=None):
+        """
+        Stream a bitstream in frame-aligned chunks. Returns (whole-image CRC32,
+        per-frame CRC32 table, concatenated per-frame digests); the tables are
+        None when track_frames is off. on_chunk(first_frame, n_frames, digests)
+        is called after each chunk.
+        """
+        crc = 0
+        frame_crcs = array("I") if track_frames else None
+        frame_digests = bytearray() if track_frames else None
+        first = 0
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(FRAME_SIZE * CHUNK_FRAMES)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                count = -(-len(chunk) // FRAME_SIZE)
+                digests = None
+                if track_frames:
+                    digests = bytearray()
+                    for off in range(0, len(chunk), FRAME_SIZE):
+                        frame = chunk[off:off + FRAME_SIZE]
+                        frame_crcs.append(zlib.crc32(frame) & 0xffffffff)
+                        digests += hashlib.blake2b(frame, digest_size=FRAME_DIGEST_SIZE).digest()
+                    frame_digests += digests
+                if on_chunk is not None:
+                    on_chunk(first, count, digests)
+                first += count
+        return crc & 0xffffffff, frame_crcs, (bytes(frame_digests) if track_frames else None)
@@ -0,0 +1,148 @@
+"""
+install_queue.py
+Per-device install scheduler in front of a PRManager.
+ - one worker thread executes requests one at a time
+ - rollback has a priority lane: it runs before any pending install
+ - a pending install is superseded by a newer one (only the latest requested
+   image gets programmed); pending rollbacks are merged into one
+ - every request returns a concurrent.futures.Future; pending requests can be
+   cancelled, a running one always completes
+
+InstallQueue also offers blocking install_and_validate() / rollback(), so it
+can stand in for the PRManager, e.g. in MonitorService.add_device.
+"""
+import threading
+from concurrent.futures import CancelledError, Future
+
+from core.metrics import metrics
+
+
+class InstallQueue:
+    def __init__(self, pr_manager, log_callback=None):
+        self.pr = pr_manager
+        self.fpga = pr_manager.fpga
+        self.log = log_callback or pr_manager.log
+        self._cond = threading.Condition()
+        self._install = None  # (future, bitstream_path, sig_path, do_self_test)
+        self._rollback = None  # (future, fast, detected_at)
+        self._running = None  # future of the request being executed
+        self._closed = False
+        self._thread = None
+        self.submitted = 0
+        self.superseded = 0
+        self.completed = 0
+
+    def submit_install(self, bitstream_path, sig_path=None, do_self_test=True):
+        """Queue an install; a still-pending earlier install is cancelled in its favour."""
+        fut = Future()
+        with self._cond:
+            self._check_open()
+            old = self._install
+            self._install = (fut, bitstream_path, sig_path, do_self_test)
+            self.submitted += 1
+            self._start()
+            self._cond.notify()
+        if old is not None and old[0].cancel():
+            self.superseded += 1
+            metrics.inc("pr.install_superseded")
+            self.log(f"[InstallQueue] Pending install of {old[1]} superseded by {bitstream_path}.")
+        return fut
+
+    def submit_rollback(self, fast=True, detected_at=None):
+        """Queue a rollback ahead of any pending install; merges with a pending rollback."""
+        detected_at = detected_at if detected_at is not None else self.fpga.now()
+        with self._cond:
+            self._check_open()
+            if self._rollback is not None and not self._rollback[0].cancelled():
+                return self._rollback[0]
+            fut = Future()
+            self._rollback = (fut, fast, detected_at)
+            self.submitted += 1
+            self._start()
+            self._cond.notify()
+        return fut
+
+    def install_and_validate(self, bitstream_path, sig_path=None, do_self_test=True):
+        """Blocking install; False if it failed, was superseded or was cancelled."""
+        try:
+            return self.submit_install(bitstream_path, sig_path, do_self_test).result()
+        except CancelledError:
+            return False
+
+    def rollback(self, fast=True, detected_at=None):
+        try:
+            return self.submit_rollback(fast, detected_at).result()
+        except CancelledError:
+            return False
+
+    def cancel_pending(self):
+        """Cancel every request that has not started; returns how many were cancelled."""
+        with self._cond:
+            pending = [job[0] for job in (self._install, self._rollback) if job is not None]
+            self._install = self._rollback = None
+        return sum(1 for fut in pending if fut.cancel())
+
+    def pending(self):
+        with self._cond:
+            return {"install": self._install[1] if self._install else None,
+                    "rollback": self._rollback is not None,
+                    "running": self._running is not None}
+
+    def stats(self):
+        with self._cond:
+            return {"submitted": self.submitted, "superseded": self.superseded, "completed": self.completed}
+
+    def shutdown(self, wait=True, cancel_pending=True):
+        if cancel_pending:
+            self.cancel_pending()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("InstallQueue is shut down.")
+
+    def _start(self):
+        # caller holds self._cond
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"install-{self.fpga.pr_region}", daemon=True)
+            self._thread.start()
+
+    def _next(self):
+        with self._cond:
+            while self._rollback is None and self._install is None:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            if self._rollback is not None:
+                (fut, fast, detected_at), self._rollback = self._rollback, None
+                call = lambda: self.pr.rollback(fast=fast, detected_at=detected_at)
+            else:
+                (fut, path, sig_path, do_self_test), self._install = self._install, None
+                call = lambda: self.pr.install_and_validate(path, sig_path, do_self_test)
+            # a cancelled future is dropped here, before anything is programmed
+            if not fut.set_running_or_notify_cancel():
+                return fut, None
+            self._running = fut
+            return fut, call
+
+    def _run(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            fut, call = job
+            if call is None:
+                continue
+            try:
+                fut.set_result(call())
+            except Exception as e:
+                self.log(f"[InstallQueue] Request failed: {e}")
+                fut.set_exception(e)
+            with self._cond:
+                self._running = None
+                self.completed += 1
@@ -0,0 +1,111 @@
+"""
+keygen_pool.py
+Background RSA key generation in a process pool with a bounded inventory of
+ready key pairs. get() hands out a pre-generated pair instantly (or waits for
+the next one if the inventory is empty) and triggers a refill.
+
+    pool = KeyGenPool(bits=3072, inventory_size=16)
+    pool.start()
+    priv_pem, pub_pem = pool.get()
+    pool.take_to_files("data/dev42_private.pem", "data/dev42_public.pem")
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from core.rsa_engine import generate_key_pem, write_key_pair
+
+
+class KeyGenPool:
+    def __init__(self, bits=3072, inventory_size=8, workers=None):
+        self.bits = bits
+        self.inventory_size = inventory_size
+        self.workers = workers or os.cpu_count() or 1
+        self._ready = deque()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._executor = None
+        self._closed = False
+        self._failures = 0  # consecutive failed generations; refilling stops at inventory_size
+        self._last_error = None
+        self.issued = 0
+        self.errors = 0
+
+    def start(self):
+        with self._cond:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._closed = False
+            self._refill()
+        return self
+
+    def get(self, timeout=None):
+        """
+        Return (private_pem, public_pem) for a fresh key pair. Each pair is
+        handed out once. Raises TimeoutError if none is ready within timeout,
+        and RuntimeError (chained to the last failure) if generation keeps
+        failing; the next call then retries.
+        """
+        with self._cond:
+            if self._executor is None and not self._closed:
+                self.start()
+            self._refill()
+            if not self._cond.wait_for(lambda: self._ready or self._closed or self._failed(), timeout):
+                raise TimeoutError("No key pair ready in the inventory.")
+            if not self._ready:
+                if self._closed:
+                    raise RuntimeError("Key generation pool is shut down.")
+                error, self._failures = self._last_error, 0
+                raise RuntimeError(f"Key generation keeps failing: {error}") from error
+            pair = self._ready.popleft()
+            self.issued += 1
+            self._refill()
+            return pair
+
+    def take_to_files(self, private_path="data/private.pem", public_path="data/public.pem", timeout=None):
+        priv, pub = self.get(timeout)
+        return write_key_pair(priv, pub, private_path, public_path)
+
+    def stats(self):
+        with self._cond:
+            return {"bits": self.bits, "available": len(self._ready), "pending": self._pending,
+                    "issued": self.issued, "errors": self.errors, "consecutive_errors": self._failures}
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._closed = True
+            executor, self._executor = self._executor, None
+            self._cond.notify_all()
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _refill(self):
+        # caller holds self._cond
+        if self._closed or self._executor is None or self._failures >= self.inventory_size:
+            return
+        while len(self._ready) + self._pending < self.inventory_size:
+            self._pending += 1
+            fut = self._executor.submit(generate_key_pem, self.bits)
+            fut.add_done_callback(self._on_done)
+
+    def _failed(self):
+        # refilling has stopped and nothing is left in flight
+        return self._failures >= self.inventory_size and self._pending == 0
+
+    def _on_done(self, fut):
+        with self._cond:
+            self._pending -= 1
+            if fut.cancelled():
+                self._cond.notify_all()
+                return
+            error = fut.exception()
+            if error is not None:
+                self.errors += 1
+                self._failures += 1
+                self._last_error = error
+            else:
+                self._failures = 0
+                self._ready.append(fut.result())
+            self._refill()
+            self._cond.notify_all()
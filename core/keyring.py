@@ -0,0 +1,75 @@
+"""
+keyring.py
+Cache of parsed PEM keys so repeated sign/verify calls skip PEM parsing.
+A cached key is reloaded when its file's mtime, inode or size changes, and the
+least-recently-used key is evicted once max_keys paths are cached. Encrypted
+private keys are cached per password, so a cached key is only returned to a
+caller that supplies the password it was decrypted with.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from cryptography.hazmat.primitives import serialization
+
+
+class KeyRing:
+    def __init__(self, max_keys=16):
+        self.max_keys = max_keys
+        self._keys = OrderedDict()  # (kind, path, password digest) -> (stat signature, key)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def public_key(self, path):
+        return self._get("public", path)
+
+    def private_key(self, path, password=None):
+        return self._get("private", path, password)
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._keys.clear()
+                return
+            path = os.path.abspath(path)
+            for cache_key in [k for k in self._keys if k[1] == path]:
+                del self._keys[cache_key]
+
+    def _get(self, kind, path, password=None):
+        # only a digest of the password is kept, never the password itself
+        secret = hashlib.sha256(password).digest() if password is not None else None
+        cache_key = (kind, os.path.abspath(path), secret)
+        st = os.stat(path)
+        sig = (st.st_mtime_ns, st.st_ino, st.st_size)
+        with self._lock:
+            entry = self._keys.get(cache_key)
+            if entry is not None and entry[0] == sig:
+                self._keys.move_to_end(cache_key)
+                self.hits += 1
+                return entry[1]
+        with open(path, "rb") as f:
+            pem = f.read()
+        if kind == "public":
+            key = serialization.load_pem_public_key(pem)
+        else:
+            key = serialization.load_pem_private_key(pem, password=password)
+        with self._lock:
+            self.misses += 1
+            self._keys[cache_key] = (sig, key)
+            self._keys.move_to_end(cache_key)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        return key
+
+
+# shared keyring used by core.signer
+default_keyring = KeyRing()
+
+
+def load_public_key(path):
+    return default_keyring.public_key(path)
+
+
+def load_private_key(path, password=None):
+    return default_keyring.private_key(path, password)
@@ -0,0 +1,123 @@
+"""
+log_pipeline.py
+Bounded log pipeline between producer threads and the GUI console.
+ - fixed-size ring buffer: when full the oldest line is dropped and counted
+ - consecutive duplicate lines are folded into "(repeated N times)"
+ - optional rate limit (lines per second) with a drop counter
+ - drain() hands the consumer one batch per poll
+ - optional sinks, e.g. RotatingFileSink, receive every accepted line
+"""
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from collections import deque
+
+
+class LogPipeline:
+    def __init__(self, capacity=5000, rate_limit=None, sinks=None):
+        """
+        capacity: lines kept until drained.
+        rate_limit: max accepted lines per second (None = unlimited).
+        """
+        self.capacity = capacity
+        self.rate_limit = rate_limit
+        self._buf = deque()
+        self._lock = threading.Lock()
+        self._sinks = list(sinks or [])
+        self._last = None
+        self._repeats = 0
+        self._dropped = 0
+        self._tokens = float(rate_limit or 0)
+        self._refill_at = time.monotonic()
+
+    def add_sink(self, sink):
+        """sink: object with write(line) and close()."""
+        self._sinks.append(sink)
+
+    def put(self, msg):
+        with self._lock:
+            if msg == self._last:
+                self._repeats += 1
+                return
+            self._flush_repeats()
+            if not self._take_token():
+                # a dropped line never reached the console, so it can't be "repeated"
+                self._last = None
+                self._dropped += 1
+                return
+            self._last = msg
+            self._append(msg)
+
+    def drain(self, max_items=None):
+        """Return (and remove) buffered lines, oldest first, as one batch."""
+        with self._lock:
+            self._flush_repeats()
+            self._last = None
+            out = []
+            if self._dropped:
+                out.append(f"[Log] {self._dropped} message(s) dropped (backpressure)")
+                self._dropped = 0
+            n = len(self._buf) if max_items is None else min(max_items, len(self._buf))
+            for _ in range(n):
+                out.append(self._buf.popleft())
+            return out
+
+    def pending(self):
+        return len(self._buf)
+
+    def close(self):
+        for sink in self._sinks:
+            sink.close()
+
+    def _append(self, line):
+        if len(self._buf) >= self.capacity:
+            self._buf.popleft()
+            self._dropped += 1
+        self._buf.append(line)
+        for sink in self._sinks:
+            sink.write(line)
+
+    def _flush_repeats(self):
+        if self._repeats:
+            self._append(f"{self._last} (repeated {self._repeats} times)")
+            self._repeats = 0
+
+    def _take_token(self):
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        self._tokens = min(float(self.rate_limit), self._tokens + (now - self._refill_at) * self.rate_limit)
+        self._refill_at = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+
+class RotatingFileSink:
+    """
+    Size-rotated log file written by a background thread, so producers never
+    block on disk I/O. Lines are dropped if the write queue fills up.
+    """
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=3, queue_size=10000):
+        self._queue = queue.Queue(maxsize=queue_size)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+        self.dropped = 0
+
+    def write(self, line):
+        record = logging.LogRecord("fpga", logging.INFO, __file__, 0, line, None, None)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
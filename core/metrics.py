@@ -0,0 +1,198 @@
+"""
+metrics.py
+Lightweight in-process instrumentation: counters and latency histograms for the
+reconfiguration hot paths (signature check, programming, self-test, rollback,
+anomaly scoring).
+
+Disabled by default; while disabled, timers and counters are a single flag check.
+Enable with metrics.enable() or by setting FPGA_METRICS=1.
+Read results with metrics.snapshot(), metrics.to_text() or metrics.to_json(),
+or register exporters (callables taking the snapshot dict) and call export().
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+RESERVOIR_SIZE = 2048  # recent samples kept per histogram for percentiles
+
+
+class Histogram:
+    def __init__(self, reservoir_size=RESERVOIR_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._recent = deque(maxlen=reservoir_size)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+        self._recent.append(value)
+
+    def summary(self, elapsed):
+        recent = sorted(self._recent)
+
+        def pct(p):
+            return recent[min(len(recent) - 1, int(p / 100.0 * len(recent)))] if recent else None
+
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": pct(50),
+            "p90": pct(90),
+            "p99": pct(99),
+            "rate_per_s": self.count / elapsed if elapsed > 0 else None,
+        }
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("registry", "name", "t0")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._exporters = []
+        self._started = time.monotonic()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._started = time.monotonic()
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    def timer(self, name):
+        """Context manager recording the block's duration (seconds) under name."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name, outcome=False):
+        """
+        Decorator form of timer(). With outcome=True the truthiness of the
+        result is also counted as "<name>.ok" / "<name>.failed".
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                t0 = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - t0)
+                if outcome:
+                    self.inc(f"{name}.ok" if result else f"{name}.failed")
+                return result
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            return {
+                "uptime_s": elapsed,
+                "counters": {
+                    name: {"count": value, "rate_per_s": value / elapsed if elapsed > 0 else None}
+                    for name, value in sorted(self._counters.items())
+                },
+                "timers": {name: hist.summary(elapsed) for name, hist in sorted(self._histograms.items())},
+            }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_text(self):
+        snap = self.snapshot()
+        lines = [f"# uptime {snap['uptime_s']:.1f}s"]
+        for name, c in snap["counters"].items():
+            lines.append(f"{name} count={c['count']} rate={c['rate_per_s'] or 0:.3f}/s")
+        for name, t in snap["timers"].items():
+            lines.append(
+                f"{name} count={t['count']} mean={t['mean']*1000:.3f}ms p50={t['p50']*1000:.3f}ms "
+                f"p99={t['p99']*1000:.3f}ms max={t['max']*1000:.3f}ms"
+            )
+        return "\n".join(lines)
+
+    def add_exporter(self, exporter):
+        """exporter: callable receiving the snapshot dict, e.g. a file writer or push client."""
+        self._exporters.append(exporter)
+
+    def remove_exporter(self, exporter):
+        self._exporters.remove(exporter)
+
+    def export(self):
+        snap = self.snapshot()
+        for exporter in list(self._exporters):
+            exporter(snap)
+        return snap
+
+
+def json_file_exporter(path):
+    """Exporter writing each snapshot as JSON to path."""
+    def export(snap):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(snap, f, indent=2)
+        os.replace(tmp, path)
+    return export
+
+
+# process-wide registry used by the core modules
+metrics = MetricsRegistry(enabled=os.environ.get("FPGA_METRICS") == "1")
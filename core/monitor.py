@@ -1,51 +1,323 @@
 
+import importlib.util
+import pickle
 import time
+from collections import deque
 import numpy as np
 
-try:
-    from sklearn.ensemble import IsolationForest
-    import joblib
-    SKLEARN_AVAILABLE = True
-except Exception:
-    SKLEARN_AVAILABLE = False
+from core.metrics import metrics
+
+# scikit-learn / joblib take over a second to import, so they are only
+# located here and imported on first use (training or baseline persistence)
+SKLEARN_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("sklearn", "joblib"))
+
+
+def _isolation_forest():
+    try:
+        from sklearn.ensemble import IsolationForest
+    except Exception:
+        return None
+    return IsolationForest
+
+
+def _joblib():
+    if not SKLEARN_AVAILABLE:
+        return None
+    try:
+        import joblib
+    except Exception:
+        return None
+    return joblib
+
+Z_THRESHOLD = 3.0
+BASELINE_FORMAT = "telemetry-baseline"
+BASELINE_VERSION = 1
+
+
+class OnlineBaseline:
+    """
+    Incremental z-score baseline (Welford running mean / variance).
+    decay:  optional weight in (0, 1) for exponentially weighted statistics,
+            so the baseline follows slow drift. The first 1/decay samples are
+            weighted equally, as in the plain baseline.
+    window: optional sliding window length; the oldest sample is removed when
+            a new one arrives.
+    Partial baselines from several workers can be combined with merge().
+    """
+    def __init__(self, keys, decay=None, window=None, warmup=10, threshold=Z_THRESHOLD):
+        if decay is not None and window is not None:
+            raise ValueError("Use either decay or window, not both.")
+        if decay is not None and not 0.0 < decay < 1.0:
+            raise ValueError("decay must be in (0, 1)")
+        self.keys = list(keys)
+        self.decay = decay
+        self.window = window
+        self.warmup = warmup
+        self.threshold = threshold
+        self.n = 0
+        self._mean = np.zeros(len(self.keys))
+        self._m2 = np.zeros(len(self.keys))
+        self._buf = deque() if window else None
+
+    @property
+    def mean(self):
+        return self._mean.copy()
+
+    @property
+    def var(self):
+        if self.n == 0:
+            return np.zeros(len(self.keys))
+        if self.decay is not None:
+            return self._m2.copy()
+        return self._m2 / self.n
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def update(self, x):
+        """x: telemetry dict or 1-D array in self.keys order."""
+        x = self._row(x)
+        if self.decay is not None:
+            self.n += 1
+            # weight 1/n until it falls to decay: the first 1/decay samples give
+            # exactly the plain Welford (unbiased-mean, population-variance)
+            # statistics, so a short seed does not underestimate the variance
+            alpha = max(self.decay, 1.0 / self.n)
+            delta = x - self._mean
+            self._mean = self._mean + alpha * delta
+            # _m2 holds the exponentially weighted variance itself
+            self._m2 = (1.0 - alpha) * (self._m2 + alpha * delta * delta)
+            return
+        if self._buf is not None:
+            self._buf.append(x)
+            if len(self._buf) > self.window:
+                self._remove(self._buf.popleft())
+        self.n += 1
+        delta = x - self._mean
+        self._mean = self._mean + delta / self.n
+        self._m2 = self._m2 + delta * (x - self._mean)
+
+    def update_batch(self, X):
+        """X: 2-D array (n_samples, n_keys) in self.keys order."""
+        X = np.asarray(X, dtype=float).reshape(-1, len(self.keys))
+        if self.decay is not None or self._buf is not None:
+            # decayed and windowed statistics depend on sample order
+            for row in X:
+                self.update(row)
+            return
+        if not len(X):
+            return
+        # Welford over the whole batch in NumPy, folded in with the Chan step
+        batch = OnlineBaseline(self.keys)
+        batch.n = len(X)
+        batch._mean = X.mean(axis=0)
+        batch._m2 = ((X - batch._mean) ** 2).sum(axis=0)
+        self.merge(batch)
+
+    def merge(self, other):
+        """
+        Combine another worker's baseline into this one (Chan et al. parallel
+        update). Decayed baselines are combined using sample counts as weights.
+        """
+        if other.keys != self.keys:
+            raise ValueError("Cannot merge baselines with different telemetry keys.")
+        if self._buf is not None or other._buf is not None:
+            raise ValueError("Windowed baselines cannot be merged.")
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self._mean, self._m2 = other.n, other._mean.copy(), other._m2.copy()
+            return self
+        n = self.n + other.n
+        delta = other._mean - self._mean
+        mean = self._mean + delta * other.n / n
+        if self.decay is not None:
+            m2 = (self._m2 * self.n + other._m2 * other.n) / n + delta * delta * self.n * other.n / (n * n)
+        else:
+            m2 = self._m2 + other._m2 + delta * delta * self.n * other.n / n
+        self.n, self._mean, self._m2 = n, mean, m2
+        return self
+
+    def score(self, X):
+        """
+        X: 2-D array (n_samples, n_keys). returns (flags, scores) like
+        TelemetryMonitor.score_batch; nothing is flagged during warmup.
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, len(self.keys))
+        scores = np.abs((X - self._mean) / (self.std + 1e-9)).max(axis=1)
+        if self.n < self.warmup:
+            return np.zeros(len(X), dtype=bool), scores
+        return scores > self.threshold, scores
+
+    def _remove(self, x):
+        # inverse Welford step for sliding windows
+        if self.n <= 1:
+            self.n, self._mean, self._m2 = 0, np.zeros(len(self.keys)), np.zeros(len(self.keys))
+            return
+        old_mean = self._mean
+        self._mean = (old_mean * self.n - x) / (self.n - 1)
+        self._m2 = np.maximum(self._m2 - (x - old_mean) * (x - self._mean), 0.0)
+        self.n -= 1
+
+    def _row(self, x):
+        if isinstance(x, dict):
+            return np.array([x[k] for k in self.keys], dtype=float)
+        return np.asarray(x, dtype=float).reshape(len(self.keys))
+
 
 class TelemetryMonitor:
     def __init__(self):
         self.model = None
         self.keys = None
+        self.mean = None
+        self.std = None
+        self.online = None
 
     def train_baseline(self, samples, use_isolationforest=True):
         """
         samples: list of telemetry dicts with same keys.
+        The sorted key order is fixed here and used for all later scoring.
         """
+        self.keys = sorted(samples[0].keys())
         X = self._to_matrix(samples)
-        if use_isolationforest and SKLEARN_AVAILABLE:
+        IsolationForest = _isolation_forest() if use_isolationforest and SKLEARN_AVAILABLE else None
+        if IsolationForest is not None:
+            self.online = None
             self.model = IsolationForest(contamination=0.01, random_state=42)
             self.model.fit(X)
             return "Trained IsolationForest model"
         else:
             # store mean & std for z-score method
-            self.keys = sorted(samples[0].keys())
-            arr = np.array(X)
+            self.model = None
+            self.online = None
+            arr = np.array(X, dtype=float)
             self.mean = arr.mean(axis=0)
             self.std = arr.std(axis=0)
             return "Trained z-score baseline"
 
+    def start_online(self, keys, decay=None, window=None, warmup=10, samples=None):
+        """
+        Switch to an incremental z-score baseline that can score immediately
+        and keeps adapting via observe(); optional samples seed it.
+        """
+        self.model = None
+        self.keys = sorted(keys)
+        self.online = OnlineBaseline(self.keys, decay=decay, window=window, warmup=warmup)
+        if samples:
+            self.online.update_batch(self.to_array(samples))
+        return f"Started online z-score baseline ({self.online.n} seed samples)"
+
+    def observe(self, telemetry, learn_anomalies=False):
+        """
+        Score one telemetry dict and fold it into the online baseline.
+        Anomalous samples are not learned unless learn_anomalies is set, so an
+        attack cannot drag the baseline along with it.
+        """
+        X = self.to_array([telemetry])
+        flags, _ = self.score_batch(X)
+        is_anom = bool(flags[0])
+        if self.online is not None and (learn_anomalies or not is_anom):
+            self.online.update(X[0])
+        return is_anom
+
+    def save_baseline(self, path):
+        """
+        Persist the trained baseline together with a header recording the
+        format version, baseline kind and telemetry key order.
+        """
+        if self.online is not None:
+            kind, state = "online", self.online
+        elif self.model is not None:
+            kind, state = "isolationforest", self.model
+        elif self.mean is not None:
+            kind, state = "zscore", {"mean": self.mean, "std": self.std}
+        else:
+            raise ValueError("No trained baseline to save.")
+        header = {"format": BASELINE_FORMAT, "version": BASELINE_VERSION, "kind": kind, "keys": list(self.keys)}
+        payload = {"header": header, "state": state}
+        joblib = _joblib()
+        if joblib is not None:
+            joblib.dump(payload, path)
+        else:
+            with open(path, "wb") as f:
+                pickle.dump(payload, f)
+        return path
+
+    def load_baseline(self, path, expected_keys=None, mmap=False):
+        """
+        Load a baseline written by save_baseline. Raises ValueError when the
+        file's version or key order doesn't match (pass expected_keys to check
+        against the live telemetry fields). mmap=True memory-maps large model
+        arrays read-only (joblib only). Only load baselines from trusted
+        locations: the file is unpickled.
+        """
+        joblib = _joblib()
+        if joblib is not None:
+            payload = joblib.load(path, mmap_mode="r" if mmap else None)
+        else:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+        header = payload.get("header", {}) if isinstance(payload, dict) else {}
+        if header.get("format") != BASELINE_FORMAT or header.get("version") != BASELINE_VERSION:
+            raise ValueError(f"Unsupported baseline file: {path}")
+        keys = list(header["keys"])
+        if expected_keys is not None and sorted(expected_keys) != keys:
+            raise ValueError(f"Baseline keys {keys} do not match telemetry keys {sorted(expected_keys)}")
+        kind, state = header["kind"], payload["state"]
+        if kind == "isolationforest" and not SKLEARN_AVAILABLE:
+            raise ValueError("Baseline needs scikit-learn, which is not installed.")
+        self.keys = keys
+        self.model = state if kind == "isolationforest" else None
+        self.online = state if kind == "online" else None
+        if kind == "zscore":
+            self.mean, self.std = state["mean"], state["std"]
+        return f"Loaded {kind} baseline from {path}"
+
+    @metrics.timed("monitor.is_anomaly")
     def is_anomaly(self, telemetry):
         """
         telemetry: dict of same keys
         returns True/False
         """
-        keys = sorted(telemetry.keys())
-        X = np.array([telemetry[k] for k in keys]).reshape(1, -1)
-        if self.model is not None:
-            pred = self.model.predict(X)  # -1 anomaly, 1 normal
-            return pred[0] == -1
+        flags, _ = self.score_batch(self.to_array([telemetry]))
+        return bool(flags[0])
+
+    def to_array(self, records):
+        """
+        records: list of telemetry dicts -> float array of shape (n, len(keys)),
+        columns in the key order chosen at training time.
+        """
+        keys = self.keys if self.keys is not None else sorted(records[0].keys())
+        return np.array([[r[k] for k in keys] for r in records], dtype=float).reshape(len(records), len(keys))
+
+    @metrics.timed("monitor.score_batch")
+    def score_batch(self, X):
+        """
+        X: 2-D array (n_samples, n_keys) in self.keys column order, or a list of dicts.
+        returns (flags, scores): boolean anomaly flags and anomaly scores, higher
+        meaning more anomalous (negated IsolationForest decision function, or
+        the largest absolute z-score across metrics).
+        """
+        if not isinstance(X, np.ndarray):
+            X = self.to_array(X)
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.online is not None:
+            flags, scores = self.online.score(X)
+        elif self.model is not None:
+            # predict(X) == -1 is decision_function(X) < 0; one pass over the trees
+            scores = -self.model.decision_function(X)
+            flags = scores > 0
         else:
-            # z-score method
-            z = (X - self.mean) / (self.std + 1e-9)
-            # flag if any dimension has z>3
-            return (np.abs(z) > 3.0).any()
+            # z-score method: flag if any dimension has |z| > 3
+            scores = np.abs((X - self.mean) / (self.std + 1e-9)).max(axis=1)
+            flags = scores > Z_THRESHOLD
+        if metrics.enabled:
+            metrics.inc("monitor.samples", len(X))
+            metrics.inc("monitor.anomalies", int(np.count_nonzero(flags)))
+        return flags, scores
 
     def _to_matrix(self, samples):
         keys = sorted(samples[0].keys())
@@ -0,0 +1,292 @@
+"""
+monitor_service.py
+Headless monitoring daemon, independent of the Tk GUI.
+A scheduler polls any number of FPGASimulator instances at per-device rates,
+scores the due samples in batches (one score_batch call per monitor) and
+triggers PRManager.rollback for devices that look anomalous. Consumers such as
+the GUI subscribe to events instead of reading a formatted log.
+
+Usage:
+    python -m core.monitor_service --devices 16 --interval 0.5 --duration 60
+"""
+import argparse
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.monitor import TelemetryMonitor
+
+
+class MonitoredDevice:
+    def __init__(self, name, fpga, pr_manager=None, monitor=None, interval=1.0, rollback_on_anomaly=True):
+        self.name = name
+        self.fpga = fpga
+        self.pr = pr_manager
+        self.monitor = monitor or TelemetryMonitor()
+        self.interval = interval
+        self.rollback_on_anomaly = rollback_on_anomaly
+        self.rolling_back = False
+        self.samples = 0
+        self.anomalies = 0
+        self.rollbacks = 0
+
+
+class MonitorService:
+    def __init__(self, log_callback=print, batch_window=0.05, warmup=10, max_rollback_workers=8, store=None):
+        """
+        batch_window: devices due within this many seconds of each other are
+        polled and scored together.
+        warmup: samples an untrained monitor learns before it starts flagging
+        (it gets an online baseline on first use).
+        store: optional TelemetryStore that keeps every polled sample.
+        """
+        self.log = log_callback
+        self.store = store
+        self.batch_window = batch_window
+        self.warmup = warmup
+        self.devices = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._subscribers = []
+        self._executor = ThreadPoolExecutor(max_workers=max_rollback_workers, thread_name_prefix="rollback")
+
+    def add_device(self, name, fpga, pr_manager=None, monitor=None, interval=1.0, rollback_on_anomaly=True):
+        """
+        Devices that share a monitor object are scored together in one batch.
+        pr_manager: PRManager, or an InstallQueue in front of it so rollbacks
+        take its priority lane instead of racing other installs.
+        """
+        dev = MonitoredDevice(name, fpga, pr_manager, monitor, interval, rollback_on_anomaly)
+        with self._lock:
+            self.devices[name] = dev
+            heapq.heappush(self._heap, (time.monotonic(), next(self._seq), name))
+        self._wake.set()
+        return dev
+
+    def remove_device(self, name):
+        with self._lock:
+            self.devices.pop(name, None)
+            self._heap = [entry for entry in self._heap if entry[2] != name]
+            heapq.heapify(self._heap)
+
+    def subscribe(self, callback, events=None):
+        """
+        callback(event_dict) is invoked from the service threads.
+        events: optional set of event types ("telemetry", "anomaly", "rollback");
+        default is all. Events are only built for types somebody subscribed to.
+        """
+        self._subscribers.append((callback, set(events) if events else None))
+
+    def unsubscribe(self, callback):
+        self._subscribers = [(cb, ev) for cb, ev in self._subscribers if cb is not callback]
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="monitor-service", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._wake.set()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def status(self):
+        with self._lock:
+            return {
+                name: {"samples": d.samples, "anomalies": d.anomalies, "rollbacks": d.rollbacks,
+                       "rolling_back": d.rolling_back, "image": d.fpga.current_image}
+                for name, d in self.devices.items()
+            }
+
+    def poll_once(self, names=None):
+        """Poll and score the given devices (all by default) immediately."""
+        with self._lock:
+            devices = [self.devices[n] for n in (names or list(self.devices)) if n in self.devices]
+        self._poll(devices)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                if not self._heap:
+                    due = None
+                else:
+                    due = self._heap[0][0]
+                now = time.monotonic()
+                batch = []
+                if due is not None and due <= now:
+                    popped = []
+                    while self._heap and self._heap[0][0] <= now + self.batch_window:
+                        popped.append(heapq.heappop(self._heap))
+                    for when, _, name in popped:
+                        dev = self.devices.get(name)
+                        if dev is None:
+                            continue  # removed
+                        batch.append(dev)
+                        # schedule from the due time to avoid drift, but never in the past
+                        heapq.heappush(self._heap, (max(when + dev.interval, now), next(self._seq), name))
+            if not batch:
+                self._wake.clear()
+                self._wake.wait(0.5 if due is None else max(0.0, min(due - now, 0.5)))
+                continue
+            try:
+                self._poll(batch)
+            except Exception as e:
+                self.log(f"[MonitorService] Poll error: {e}")
+
+    def _poll(self, devices):
+        groups = {}
+        for dev in devices:
+            if dev.rolling_back:
+                continue
+            groups.setdefault(id(dev.monitor), []).append((dev, dev.fpga.get_telemetry()))
+        for group in groups.values():
+            self._score_group(group)
+
+    def _score_group(self, group):
+        monitor = group[0][0].monitor
+        samples = [t for _, t in group]
+        if monitor.online is None and monitor.model is None and monitor.mean is None:
+            monitor.start_online(samples[0].keys(), warmup=self.warmup)
+        X = monitor.to_array(samples)
+        flags, scores = monitor.score_batch(X)
+        if monitor.online is not None:
+            # keep adapting, but never learn anomalous samples
+            monitor.online.update_batch(X[~flags])
+        want_telemetry = self._wants("telemetry")
+        now = time.time()
+        for (dev, telemetry), flag, score in zip(group, flags, scores):
+            dev.samples += 1
+            if self.store is not None:
+                self.store.append(dev.name, telemetry, now)
+            if want_telemetry:
+                self._emit({"type": "telemetry", "device": dev.name, "time": now,
+                            "telemetry": telemetry, "anomaly": bool(flag), "score": float(score)})
+            if flag:
+                dev.anomalies += 1
+                self._emit({"type": "anomaly", "device": dev.name, "time": now,
+                            "telemetry": telemetry, "score": float(score)})
+                if dev.rollback_on_anomaly and dev.pr is not None and not dev.rolling_back:
+                    dev.rolling_back = True
+                    self._executor.submit(self._rollback, dev, dev.fpga.now())
+
+    def _rollback(self, dev, detected_at):
+        try:
+            # time-to-recovery is measured from detection, including queueing
+            ok = dev.pr.rollback(detected_at=detected_at)
+        except Exception as e:
+            self.log(f"[MonitorService] {dev.name}: rollback error: {e}")
+            ok = False
+        dev.rollbacks += 1
+        dev.rolling_back = False
+        self._emit({"type": "rollback", "device": dev.name, "time": time.time(),
+                    "ok": ok, "seconds": dev.fpga.now() - detected_at})
+
+    def _wants(self, event_type):
+        return any(ev is None or event_type in ev for _, ev in self._subscribers)
+
+    def _emit(self, event):
+        for callback, events in list(self._subscribers):
+            if events is None or event["type"] in events:
+                try:
+                    callback(event)
+                except Exception as e:
+                    self.log(f"[MonitorService] Subscriber error: {e}")
+
+
+def main(argv=None):
+    from core.fpga_simulator import FPGASimulator
+    from core.pr_manager import PRManager
+    from core.telemetry_store import TelemetryStore
+    from core.trust_cache import VerifiedCache
+
+    parser = argparse.ArgumentParser(description="Headless FPGA telemetry monitoring service.")
+    parser.add_argument("--devices", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=1.0, help="poll interval per device (s)")
+    parser.add_argument("--duration", type=float, default=0, help="stop after N seconds (0 = run until Ctrl+C)")
+    parser.add_argument("--safe-image", default="data/safe_module.bit")
+    parser.add_argument("--public-key", default="data/public.pem")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="scale for simulated programming delays")
+    parser.add_argument("--history", type=int, default=3600, help="samples of telemetry kept per device")
+    parser.add_argument("--report-every", type=float, default=10.0, help="status line interval (s)")
+    parser.add_argument("--demo-attack", type=float, default=0,
+                        help="program a bad module into device 0 after N seconds")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.safe_image):
+        print(f"[MonitorService] Safe image not found: {args.safe_image}")
+        return 1
+    service = MonitorService(store=TelemetryStore(capacity=args.history))
+    shared = TelemetryMonitor()
+    trust_cache = VerifiedCache()
+    quiet = lambda msg: None
+    fpgas = [FPGASimulator(pr_region=f"dev{i}/PR0", time_scale=args.time_scale) for i in range(args.devices)]
+    prs = [PRManager(fpga, public_key_path=args.public_key, safe_image=args.safe_image,
+                     log_callback=quiet, trust_cache=trust_cache) for fpga in fpgas]
+
+    def bring_up(pr):
+        # active region runs the safe image; a second copy is prestaged for fast rollback
+        pr.fpga.program_partial(args.safe_image, log_callback=quiet)
+        pr.prestage_safe_image()
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        list(pool.map(bring_up, prs))
+    for i, pr in enumerate(prs):
+        service.add_device(f"dev{i}", pr.fpga, pr, monitor=shared, interval=args.interval)
+
+    def on_event(event):
+        if event["type"] == "anomaly":
+            print(f"[MonitorService] {event['device']}: anomaly (score={event['score']:.2f}) {event['telemetry']}")
+        else:
+            state = "ok" if event["ok"] else "FAILED"
+            print(f"[MonitorService] {event['device']}: rollback {state}, time to recovery {event['seconds']*1000:.0f} ms")
+    service.subscribe(on_event, events={"anomaly", "rollback"})
+    service.start()
+    print(f"[MonitorService] Monitoring {args.devices} device(s) every {args.interval}s")
+
+    started = time.monotonic()
+    next_report = started + args.report_every
+    attacked = False
+    try:
+        while args.duration <= 0 or time.monotonic() - started < args.duration:
+            time.sleep(0.2)
+            if args.demo_attack and not attacked and time.monotonic() - started >= args.demo_attack:
+                bad_path = os.path.join(os.path.dirname(args.safe_image) or ".", "bad_module.bit")
+                with open(bad_path, "wb") as f:
+                    f.write(b"BAD_MODULE_V1" * 200)
+                with prs[0].lock:
+                    prs[0].fpga.program_partial(bad_path, log_callback=quiet)
+                print("[MonitorService] Demo: injected bad module into dev0")
+                attacked = True
+            if time.monotonic() >= next_report:
+                status = service.status()
+                samples = sum(s["samples"] for s in status.values())
+                anomalies = sum(s["anomalies"] for s in status.values())
+                rollbacks = sum(s["rollbacks"] for s in status.values())
+                cpu = [ring.mean("cpu", seconds=args.report_every) for ring in service.store.rings.values()]
+                cpu = [c for c in cpu if c is not None]
+                avg_cpu = f"{sum(cpu) / len(cpu):.1f}" if cpu else "-"
+                print(f"[MonitorService] samples={samples} anomalies={anomalies} rollbacks={rollbacks} "
+                      f"fleet_cpu_mean={avg_cpu} history={service.store.nbytes() // 1024} KiB")
+                next_report += args.report_every
+    except KeyboardInterrupt:
+        pass
+    service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
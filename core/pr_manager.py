@@ -4,25 +4,62 @@ Orchestrates secure partial reconfiguration:
  - verify signature
  - program simulated FPGA
  - run self-test
- - rollback to a safe image if needed
+ - rollback to a safe image if needed (fast switch-over when the safe
+   image has been prestaged in the FPGA's shadow region)
+Signature checks go through a VerifiedCache so an unchanged, already
+verified bitstream is accepted without another RSA verification. Bitstreams
+listed in a loaded SignedBundle are checked by hash against its manifest instead.
 """
 import os
-import time
-from core.signer import verify_signature
+import threading
+from core.bundle import SignedBundle
+from core.trust_cache import VerifiedCache
 from core.explain_module import explain_reconfiguration
+from core.metrics import metrics
 
 class PRManager:
-    def __init__(self, fpga_simulator, public_key_path="data/public.pem", safe_image="data/safe_module.bit", log_callback=print):
+    def __init__(self, fpga_simulator, public_key_path="data/public.pem", safe_image="data/safe_module.bit", log_callback=print, trust_cache=None, bundle=None,
+                 background_restage=True, allow_unsigned_safe_image=False):
         self.fpga = fpga_simulator
         self.pubkey = public_key_path
         self.safe_image = safe_image
         self.log = log_callback
+        self.trust_cache = trust_cache if trust_cache is not None else VerifiedCache()
+        self.bundle = bundle
+        # an unsigned safe image is refused unless explicitly allowed (demo setups)
+        self.allow_unsigned_safe_image = allow_unsigned_safe_image
+        # after a fast rollback, re-read and restage the safe image on a thread;
+        # when False it runs inline once time-to-recovery is recorded (deterministic simulations)
+        self.background_restage = background_restage
+        self._restage_pending = False
+        self.last_recovery_seconds = None
+        # held while the device is being reconfigured; callers that program
+        # self.fpga directly should take it too (see core.install_queue)
+        self.lock = threading.RLock()
 
-    def install_and_validate(self, bitstream_path, sig_path, do_self_test=True):
+    def load_bundle(self, manifest_path):
+        """
+        Verify a signed bundle manifest (one RSA operation); its members are
+        then checked by hash when installed.
+        """
+        bundle, msg = SignedBundle.load(manifest_path, public_key_path=self.pubkey)
+        self.log(f"[PRManager] {msg}")
+        if bundle is None:
+            return False
+        self.bundle = bundle
+        return True
+
+    def install_and_validate(self, bitstream_path, sig_path=None, do_self_test=True):
+        with self.lock:
+            return self._install(bitstream_path, sig_path, do_self_test)
+
+    @metrics.timed("pr.install", outcome=True)
+    def _install(self, bitstream_path, sig_path, do_self_test):
         # Explain step to user
         self.log(explain_reconfiguration(bitstream_path))
         # Verify signature
-        ok, msg = verify_signature(self.pubkey, bitstream_path, sig_path)
+        with metrics.timer("pr.signature_check"):
+            ok, msg = self._check_signature(bitstream_path, sig_path)
         self.log(f"[PRManager] Signature check: {msg}")
         if not ok:
             self.log("[PRManager] Aborting installation due to invalid signature.")
@@ -35,7 +72,7 @@ class PRManager:
         # Self-test
         if do_self_test:
             self.log("[PRManager] Running self-test...")
-            time.sleep(0.5)
+            self.fpga.delay(0.5)
             if not self.fpga.self_test(log_callback=self.log):
                 self.log("[PRManager] Self-test failed. Initiating rollback.")
                 self.rollback()
@@ -43,9 +80,89 @@ class PRManager:
         self.log("[PRManager] Installation successful.")
         return True
 
-    def rollback(self):
-        if not self.safe_image or not os.path.exists(self.safe_image):
-            self.log("[PRManager] No safe image available for rollback.")
+    def prestage_safe_image(self):
+        """
+        Verify the safe image once and stage it in the FPGA's shadow region,
+        so rollback() can switch to it without reprogramming.
+        """
+        with self.lock:
+            if not self._check_safe_image():
+                return False
+            return self.fpga.stage_shadow(self.safe_image, log_callback=self.log)
+
+    def rollback(self, fast=True, detected_at=None):
+        """
+        fast: use the prestaged shadow image when one is ready.
+        detected_at: fpga.now() value (time.perf_counter() unless the FPGA runs on
+        a virtual clock) of when the fault was detected; time-to-recovery is
+        measured from there (default: from this call).
+        """
+        started = detected_at if detected_at is not None else self.fpga.now()
+        with self.lock:
+            return self._rollback(fast, started)
+
+    @metrics.timed("pr.rollback", outcome=True)
+    def _rollback(self, fast, started):
+        if fast and self.safe_image and self.fpga.shadow_image() == self.safe_image:
+            ok = self._rollback_fast()
+        else:
+            ok = self._rollback_slow()
+        recovered_at = self.fpga.now()
+        if self._restage_pending:
+            # deterministic mode: the deferred checks run inline and can still
+            # turn this into a failed (or slow) rollback
+            self._restage_pending = False
+            ok = self._restage_after_rollback()
+        if ok:
+            self.last_recovery_seconds = recovered_at - started
+            metrics.observe("pr.time_to_recovery", self.last_recovery_seconds)
+            self.log(f"[PRManager] Time to recovery: {self.last_recovery_seconds * 1000:.0f} ms")
+        return ok
+
+    def _rollback_fast(self):
+        # trust was established when the image was staged, but shadow_image()
+        # only compares file metadata; the deferred readback and re-verification
+        # in _restage_after_rollback confirm it or invalidate this recovery
+        self.log(f"[PRManager] Fast rollback: switching to prestaged safe image {self.safe_image}")
+        if not self.fpga.switch_to_shadow(log_callback=self.log):
+            return self._rollback_slow()
+        # quick self-test on the CRC captured at staging; the full per-frame
+        # readback and restaging of the shadow run in the background
+        if not self.fpga.self_test(log_callback=self.log):
+            self.log("[PRManager] Rollback self-test failed.")
+            return False
+        self.log("[PRManager] Rollback success.")
+        if self.background_restage:
+            threading.Thread(target=self._after_fast_rollback, daemon=True).start()
+        else:
+            self._restage_pending = True
+        return True
+
+    def _after_fast_rollback(self):
+        with self.lock:
+            self._restage_after_rollback()
+
+    def _restage_after_rollback(self):
+        """
+        Deferred half of a fast rollback: full readback of the active safe
+        image and a fresh signature check, then restage the shadow. If either
+        check fails the recovery is invalidated (pr.rollback_invalidated) and
+        the safe image is reprogrammed the slow way; returns that outcome.
+        """
+        bad = self.fpga.verify_frames()
+        if bad:
+            self.log(f"[PRManager] ERROR: deferred readback found {len(bad)} mismatched frame(s) in safe image.")
+        if bad or not self._check_safe_image():
+            metrics.inc("pr.rollback_invalidated")
+            self.last_recovery_seconds = None
+            self.log("[PRManager] Fast rollback invalidated; falling back to a full rollback.")
+            return self._rollback_slow()
+        self.log("[PRManager] Deferred readback of safe image: all frames OK.")
+        self.fpga.stage_shadow(self.safe_image, log_callback=self.log)
+        return True
+
+    def _rollback_slow(self):
+        if not self._check_safe_image():
             return False
         self.log(f"[PRManager] Rolling back to safe image: {self.safe_image}")
         ok = self.fpga.program_partial(self.safe_image, log_callback=self.log)
@@ -60,3 +177,29 @@ class PRManager:
         else:
             self.log("[PRManager] Rollback programming failed.")
             return False
+
+    def _check_safe_image(self):
+        if not self.safe_image or not os.path.exists(self.safe_image):
+            self.log("[PRManager] No safe image available for rollback.")
+            return False
+        safe_sig = self.safe_image + ".sig"
+        if os.path.exists(safe_sig) or (self.bundle is not None and self.safe_image in self.bundle):
+            ok, msg = self._check_signature(self.safe_image)
+            self.log(f"[PRManager] Safe image signature check: {msg}")
+            if not ok:
+                self.log("[PRManager] Refusing rollback to an unverified safe image.")
+                return False
+        elif self.allow_unsigned_safe_image:
+            self.log("[PRManager] WARNING: safe image is unsigned; rolling back without a trust check.")
+        else:
+            self.log(f"[PRManager] Safe image is unsigned (no {safe_sig}); refusing to use it.")
+            return False
+        return True
+
+    def _check_signature(self, bitstream_path, sig_path=None):
+        # a detached signature wins; otherwise fall back to the loaded bundle
+        if sig_path is None or not os.path.exists(sig_path):
+            if self.bundle is not None and bitstream_path in self.bundle:
+                return self.bundle.check_member(bitstream_path)
+            sig_path = sig_path or bitstream_path + ".sig"
+        return self.trust_cache.verify(self.pubkey, bitstream_path, sig_path)
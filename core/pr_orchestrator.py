@@ -0,0 +1,129 @@
+"""
+pr_orchestrator.py
+Asyncio orchestration of many PR regions (or many simulated devices) at once.
+Each region has its own FPGASimulator + PRManager; independent
+verify -> program -> self-test -> rollback pipelines run concurrently, while a
+per-region lock guarantees two installs never race on the same region.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from core.bundle import SignedBundle
+from core.fpga_simulator import FPGASimulator
+from core.pr_manager import PRManager
+from core.trust_cache import VerifiedCache
+
+
+class PROrchestrator:
+    def __init__(self, public_key_path="data/public.pem", safe_image="data/safe_module.bit",
+                 log_callback=print, trust_cache=None, max_workers=64):
+        self.pubkey = public_key_path
+        self.safe_image = safe_image
+        self.log = log_callback
+        # one cache shared by every region: a module verified once is trusted everywhere
+        self.trust_cache = trust_cache if trust_cache is not None else VerifiedCache()
+        self.bundle = None
+        self.managers = {}
+        self._locks = {}
+        self._locks_loop = None
+        # PRManager/FPGASimulator are blocking, so each pipeline runs on a worker thread
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pr-region")
+
+    def add_region(self, region, fpga=None, safe_image=None):
+        """
+        region: any hashable id, e.g. "PR0" or ("device3", "PR1").
+        """
+        if fpga is None:
+            fpga = FPGASimulator(pr_region=str(region))
+        self.managers[region] = PRManager(
+            fpga,
+            public_key_path=self.pubkey,
+            safe_image=safe_image or self.safe_image,
+            log_callback=self._region_log(region),
+            trust_cache=self.trust_cache,
+            bundle=self.bundle,
+        )
+        return self.managers[region]
+
+    def load_bundle(self, manifest_path):
+        """
+        Verify a signed bundle once and share it with every region, so a
+        release costs one RSA verification for the whole fleet.
+        """
+        bundle, msg = SignedBundle.load(manifest_path, public_key_path=self.pubkey)
+        self.log(f"[Orchestrator] {msg}")
+        if bundle is None:
+            return False
+        self.bundle = bundle
+        for manager in self.managers.values():
+            manager.bundle = bundle
+        return True
+
+    def regions(self):
+        return list(self.managers)
+
+    async def install(self, region, bitstream_path, sig_path=None, do_self_test=True):
+        manager = self._manager(region)
+        async with self._lock(region):
+            return await self._run(manager.install_and_validate, bitstream_path, sig_path, do_self_test)
+
+    async def rollback(self, region):
+        manager = self._manager(region)
+        async with self._lock(region):
+            return await self._run(manager.rollback)
+
+    async def install_many(self, jobs, do_self_test=True):
+        """
+        jobs: iterable of (region, bitstream_path) or (region, bitstream_path, sig_path).
+        Jobs for different regions run concurrently; jobs for the same region run
+        in submission order. Returns a list of (region, bitstream_path, ok).
+        """
+        jobs = [tuple(j) for j in jobs]
+
+        async def one(job):
+            region, path = job[0], job[1]
+            sig = job[2] if len(job) > 2 else None
+            try:
+                ok = await self.install(region, path, sig, do_self_test)
+            except Exception as e:
+                self._region_log(region)(f"[Orchestrator] Install error: {e}")
+                ok = False
+            return region, path, ok
+
+        return await asyncio.gather(*(one(j) for j in jobs))
+
+    async def rollback_all(self, regions=None):
+        regions = list(regions) if regions is not None else self.regions()
+        results = await asyncio.gather(*(self.rollback(r) for r in regions))
+        return dict(zip(regions, results))
+
+    def run(self, coro):
+        """Convenience wrapper for synchronous callers: orchestrator.run(orchestrator.install_many(jobs))."""
+        return asyncio.run(coro)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _manager(self, region):
+        if region not in self.managers:
+            raise KeyError(f"Unknown PR region: {region}")
+        return self.managers[region]
+
+    def _lock(self, region):
+        # created lazily so the lock binds to the running event loop; a new loop
+        # (e.g. a second run() call) gets a fresh set of locks
+        loop = asyncio.get_running_loop()
+        if self._locks_loop is not loop:
+            self._locks = {}
+            self._locks_loop = loop
+        lock = self._locks.get(region)
+        if lock is None:
+            lock = self._locks[region] = asyncio.Lock()
+        return lock
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _region_log(self, region):
+        return lambda msg: self.log(f"[{region}] {msg}")
@@ -1,42 +1,73 @@
 """
 signer.py
 Sign and verify bitstream files using RSA-PSS and SHA256.
+Bitstreams are hashed in fixed-size chunks and the prehashed digest is signed,
+so memory use stays flat regardless of bitstream size.
+Parsed keys are reused through core.keyring.
 """
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, utils
+import hashlib
 import os
+from core.keyring import load_private_key, load_public_key
+from core.metrics import metrics
 
-def sign_file(bitstream_path, private_key_path="data/private.pem", sig_out=None):
+CHUNK_SIZE = 1024 * 1024  # 1 MiB per read
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """
+    Return the SHA-256 digest (bytes) of a file, read in chunks of chunk_size.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.digest()
+
+
+def _pss():
+    return padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+
+@metrics.timed("signer.sign_file")
+def sign_file(bitstream_path, private_key_path="data/private.pem", sig_out=None, chunk_size=CHUNK_SIZE):
     if sig_out is None:
         sig_out = bitstream_path + ".sig"
     if not os.path.exists(bitstream_path):
         raise FileNotFoundError(f"Bitstream not found: {bitstream_path}")
-    with open(private_key_path, "rb") as f:
-        key = serialization.load_pem_private_key(f.read(), password=None)
-    data = open(bitstream_path, "rb").read()
-    signature = key.sign(
-        data,
-        padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
-        hashes.SHA256()
-    )
+    key = load_private_key(private_key_path)
+    digest = hash_file(bitstream_path, chunk_size)
+    # signing the prehashed digest yields the same signature as signing the raw data
+    signature = key.sign(digest, _pss(), utils.Prehashed(hashes.SHA256()))
     with open(sig_out, "wb") as f:
         f.write(signature)
     return sig_out
 
-def verify_signature(public_key_path, bitstream_path, sig_path):
+
+@metrics.timed("signer.verify_signature")
+def verify_signature(public_key_path, bitstream_path, sig_path, chunk_size=CHUNK_SIZE):
     if not (os.path.exists(public_key_path) and os.path.exists(bitstream_path) and os.path.exists(sig_path)):
         return False, "Missing public key / bitstream / signature file."
-    with open(public_key_path, "rb") as f:
-        pub = serialization.load_pem_public_key(f.read())
-    data = open(bitstream_path, "rb").read()
-    signature = open(sig_path, "rb").read()
+    with open(sig_path, "rb") as f:
+        signature = f.read()
+    try:
+        digest = hash_file(bitstream_path, chunk_size)
+    except Exception as e:
+        return False, f"Signature verification failed: {e}"
+    return verify_digest(public_key_path, digest, signature)
+
+
+def verify_digest(public_key_path, digest, signature):
+    """
+    Verify an RSA-PSS signature over an already computed SHA-256 digest.
+    """
     try:
-        pub.verify(
-            signature,
-            data,
-            padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
-            hashes.SHA256()
-        )
+        pub = load_public_key(public_key_path)
+        pub.verify(signature, digest, _pss(), utils.Prehashed(hashes.SHA256()))
         return True, "Signature valid."
     except Exception as e:
         return False, f"Signature verification failed: {e}"
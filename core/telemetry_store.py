@@ -0,0 +1,165 @@
+"""
+telemetry_store.py
+Compact telemetry history: one fixed-size NumPy ring buffer per metric
+(packet_rate, errors, cpu, ...) plus a timestamp column, per device.
+
+Each sample is written twice (at i and i + capacity), so the latest n <= capacity
+samples are always one contiguous slice and windows are returned as zero-copy
+views (valid until the next append; pass copy=True to keep one). Appends are O(1). With spill_dir set, columns are memory-mapped .npy
+files, so long histories live on disk instead of in RAM.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class TelemetryRing:
+    def __init__(self, keys, capacity=3600, dtype=np.float32, spill_path=None):
+        """
+        keys: metric names (fixed column order).
+        spill_path: optional file prefix; columns become memory-mapped
+        <spill_path>.<key>.npy files.
+        """
+        self.keys = list(keys)
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._cols = {k: self._alloc(k, dtype) for k in self.keys}
+        self._ts = self._alloc("_time", np.float64)
+        self._next = 0  # slot for the next sample, in [0, capacity)
+        self.count = 0  # samples currently held (<= capacity)
+        self.total = 0  # samples ever appended
+        self._lock = threading.Lock()
+
+    def append(self, sample, t=None):
+        """sample: dict with (at least) self.keys. t: timestamp, default time.time()."""
+        t = time.time() if t is None else t
+        with self._lock:
+            i, j = self._next, self._next + self.capacity
+            for k in self.keys:
+                v = sample[k]
+                col = self._cols[k]
+                col[i] = v
+                col[j] = v
+            self._ts[i] = t
+            self._ts[j] = t
+            self._next = (self._next + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.total += 1
+
+    def window(self, key, n=None, seconds=None, copy=False):
+        """
+        Latest n samples (or those from the last `seconds`), oldest first.
+        key may be a metric name or "time".
+        By default this is a zero-copy view that aliases the ring: once the
+        ring is full, every append overwrites the oldest element inside any
+        view a caller still holds, and reading the view takes no lock. Use it
+        for immediate aggregates; pass copy=True for a consistent snapshot to
+        keep (retraining, investigations).
+        """
+        col = self._ts if key == "time" else self._cols[key]
+        with self._lock:
+            start, end = self._bounds(n, seconds)
+            return col[start:end].copy() if copy else col[start:end]
+
+    def matrix(self, n=None, seconds=None, keys=None):
+        """(n, len(keys)) float array of the window (a copy), e.g. for TelemetryMonitor.score_batch."""
+        keys = keys or sorted(self.keys)
+        with self._lock:
+            start, end = self._bounds(n, seconds)
+            return np.column_stack([self._cols[k][start:end] for k in keys]).astype(float)
+
+    def records(self, n=None, seconds=None):
+        """Window as a list of dicts, e.g. for TelemetryMonitor.train_baseline."""
+        with self._lock:
+            start, end = self._bounds(n, seconds)
+            cols = {k: self._cols[k][start:end].tolist() for k in self.keys}
+        return [{k: cols[k][i] for k in self.keys} for i in range(end - start)]
+
+    def mean(self, key, n=None, seconds=None):
+        w = self.window(key, n, seconds)
+        return float(w.mean(dtype=np.float64)) if len(w) else None
+
+    def percentile(self, key, q, n=None, seconds=None):
+        w = self.window(key, n, seconds)
+        return float(np.percentile(w, q)) if len(w) else None
+
+    def rolling_mean(self, key, k, n=None, seconds=None):
+        """Mean over each run of k consecutive samples in the window (length len(window) - k + 1)."""
+        w = self.window(key, n, seconds).astype(np.float64)
+        if len(w) < k:
+            return np.empty(0)
+        c = np.cumsum(np.insert(w, 0, 0.0))
+        return (c[k:] - c[:-k]) / k
+
+    def summary(self, n=None, seconds=None):
+        """Per-metric mean / p50 / p99 / max over the window."""
+        out = {}
+        for key in self.keys:
+            w = self.window(key, n, seconds)
+            if not len(w):
+                continue
+            p50, p99 = np.percentile(w, [50, 99])
+            out[key] = {"mean": float(w.mean(dtype=np.float64)), "p50": float(p50),
+                        "p99": float(p99), "max": float(w.max())}
+        return out
+
+    def flush(self):
+        if self.spill_path:
+            for col in list(self._cols.values()) + [self._ts]:
+                col.flush()
+
+    def nbytes(self):
+        return sum(col.nbytes for col in self._cols.values()) + self._ts.nbytes
+
+    def _bounds(self, n, seconds):
+        # caller holds self._lock; the latest `count` samples are at [next + capacity - count, next + capacity)
+        end = self._next + self.capacity
+        size = self.count if n is None else min(n, self.count)
+        start = end - size
+        if seconds is not None and size:
+            ts = self._ts[start:end]
+            start += int(np.searchsorted(ts, ts[-1] - seconds, side="left"))
+        return start, end
+
+    def _alloc(self, key, dtype):
+        shape = (2 * self.capacity,)
+        if self.spill_path:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            return np.lib.format.open_memmap(f"{self.spill_path}.{key}.npy", mode="w+", dtype=dtype, shape=shape)
+        return np.zeros(shape, dtype=dtype)
+
+
+class TelemetryStore:
+    """Per-device TelemetryRing buffers, created on first sample."""
+    def __init__(self, capacity=3600, dtype=np.float32, spill_dir=None):
+        self.capacity = capacity
+        self.dtype = dtype
+        self.spill_dir = spill_dir
+        self.rings = {}
+        self._lock = threading.Lock()
+
+    def append(self, device, sample, t=None):
+        ring = self.rings.get(device)
+        if ring is None:
+            with self._lock:
+                ring = self.rings.get(device)
+                if ring is None:
+                    spill = os.path.join(self.spill_dir, str(device)) if self.spill_dir else None
+                    ring = self.rings[device] = TelemetryRing(sorted(sample.keys()), self.capacity,
+                                                              self.dtype, spill)
+        ring.append(sample, t)
+
+    def get(self, device):
+        return self.rings.get(device)
+
+    def devices(self):
+        return list(self.rings)
+
+    def flush(self):
+        for ring in self.rings.values():
+            ring.flush()
+
+    def nbytes(self):
+        return sum(r.nbytes() for r in self.rings.values())
@@ -0,0 +1,121 @@
+"""
+trust_cache.py
+Cache of bitstreams that already passed RSA signature verification.
+Entries are keyed by (content SHA-256, signature SHA-256, public key fingerprint),
+so a changed bitstream, signature or key never matches a stale entry.
+The bitstream is re-hashed on every call (file metadata can be forged, e.g.
+an in-place edit with the mtime restored); a hit only skips the RSA step.
+
+The cache lives in memory unless a path is given. A persisted cache is
+authenticated with an HMAC under `secret`, which must be kept somewhere the
+cache file's writers cannot read (not under data/); a file whose HMAC does not
+match is ignored, so a forged entry costs a re-verification and nothing more.
+"""
+import hashlib
+import hmac
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from cryptography.hazmat.primitives import serialization
+
+from core.keyring import load_public_key
+from core.metrics import metrics
+from core.signer import hash_file, verify_digest
+
+
+def key_fingerprint(public_key):
+    der = public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return hashlib.sha256(der).hexdigest()
+
+
+class VerifiedCache:
+    def __init__(self, path=None, max_entries=1024, secret=None):
+        if path and not secret:
+            raise ValueError("A persisted VerifiedCache needs a secret to authenticate its entries.")
+        self.path = path
+        self._secret = secret
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # cache key -> bitstream path (informational)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def verify(self, public_key_path, bitstream_path, sig_path):
+        """
+        Same contract as core.signer.verify_signature: returns (ok, msg).
+        Only successful verifications are cached.
+        """
+        if not (os.path.exists(public_key_path) and os.path.exists(bitstream_path) and os.path.exists(sig_path)):
+            return False, "Missing public key / bitstream / signature file."
+        try:
+            with open(sig_path, "rb") as f:
+                signature = f.read()
+            fingerprint = key_fingerprint(load_public_key(public_key_path))
+            # the cached key is exactly the digest that gets verified below
+            digest = hash_file(bitstream_path)
+        except Exception as e:
+            return False, f"Signature verification failed: {e}"
+        key = f"{digest.hex()}:{hashlib.sha256(signature).hexdigest()}:{fingerprint}"
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.inc("trust_cache.hit")
+                return True, "Signature valid (cached)."
+            self.misses += 1
+            metrics.inc("trust_cache.miss")
+        ok, msg = verify_digest(public_key_path, digest, signature)
+        if ok:
+            with self._lock:
+                self._entries[key] = os.path.abspath(bitstream_path)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            self._save()
+        return ok, msg
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _mac(self, entries):
+        payload = json.dumps(entries, sort_keys=True, separators=(",", ":")).encode()
+        return hmac.new(self._secret, payload, hashlib.sha256).hexdigest()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            entries = data["entries"]
+            if data.get("version") != 2 or not hmac.compare_digest(str(data.get("mac", "")), self._mac(entries)):
+                # unauthenticated or from another secret: start empty
+                metrics.inc("trust_cache.rejected_file")
+                return
+            for key, bitstream in entries[-self.max_entries:]:
+                self._entries[key] = bitstream
+        except Exception:
+            # a corrupt cache only costs a re-verification
+            self._entries.clear()
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            entries = [list(item) for item in self._entries.items()]
+        data = {"version": 2, "entries": entries, "mac": self._mac(entries)}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
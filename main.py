@@ -1,16 +1,14 @@
 import os
 import threading
-import queue
 import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
 
-from core.rsa_engine import generate_keys, explain_keygen
-from core.signer import sign_file, verify_signature
+# only cheap modules are imported here; cryptography, NumPy and scikit-learn
+# load on first use of the feature that needs them (see benchmarks startup budget)
 from core.fpga_simulator import FPGASimulator
-from core.pr_manager import PRManager
-from core.explain_module import explain_signing, explain_verification
-from core.monitor import TelemetryMonitor
+from core.explain_module import explain_keygen, explain_signing, explain_verification
+from core.log_pipeline import LogPipeline, RotatingFileSink
 
 from core.chatbot import chatbot_reply
 
@@ -61,12 +59,18 @@ def open_chatbot():
 
 # Ensure data folder exists
 os.makedirs("data", exist_ok=True)
+BASELINE_PATH = "data/monitor_baseline.joblib"
 
-# Simple thread-safe logger for GUI
-log_queue = queue.Queue()
+MAX_CONSOLE_LINES = 5000  # console scrollback cap
+KEYGEN_TIMEOUT = 120  # seconds to wait for a key pair before reporting an error
+
+# Bounded, thread-safe log pipeline for the GUI console
+log_pipeline = LogPipeline(capacity=5000, rate_limit=200)
+if os.environ.get("FPGA_LOG_FILE"):
+    log_pipeline.add_sink(RotatingFileSink(os.environ["FPGA_LOG_FILE"]))
 
 def gui_log(msg):
-    log_queue.put(msg)
+    log_pipeline.put(msg)
 
 class App:
     def __init__(self, root):
@@ -105,33 +109,103 @@ class App:
 
         # internal
         self.fpga = FPGASimulator()
-        self.pr = PRManager(self.fpga, public_key_path="data/public.pem", safe_image="data/safe_module.bit", log_callback=gui_log)
-        self.monitor = TelemetryMonitor()
+        self._pr = None
+        self._installs = None
+        self._pr_lock = threading.Lock()
+        self.monitor = None
+        self.service = None
         self.monitor_thread = None
         self.monitor_running = False
+        self._monitor_lock = threading.Lock()
+        self.keygen = None
+        self._keygen_lock = threading.Lock()
 
         # start GUI log polling
         self.root.after(100, self._poll_log_queue)
 
+    @property
+    def pr(self):
+        return self._reconfiguration()[0]
+
+    @property
+    def installs(self):
+        return self._reconfiguration()[1]
+
+    def _reconfiguration(self):
+        # the Tk thread and the monitoring thread both get here: build the
+        # PRManager and its InstallQueue once, together, so there is one lock
+        # and one queue per device. Installs and rollbacks of self.fpga go
+        # through the queue; the monitoring demo's bring-up and attack
+        # injection program it directly, holding pr.lock.
+        with self._pr_lock:
+            if self._pr is None:
+                from core.install_queue import InstallQueue
+                from core.pr_manager import PRManager
+                # rollback refuses the safe image unless it is signed (see _prepare_safe_image)
+                self._pr = PRManager(self.fpga, public_key_path="data/public.pem", safe_image="data/safe_module.bit",
+                                     log_callback=gui_log)
+                self._installs = InstallQueue(self._pr)
+            return self._pr, self._installs
+
+    def _queue_install(self, path, sig_path, ok_text, fail_text):
+        # runs on the install worker; superseded/cancelled requests report nothing
+        def done(fut):
+            if fut.cancelled():
+                return
+            success = not fut.exception() and fut.result()
+            if success:
+                self.root.after(0, lambda: messagebox.showinfo("Success", ok_text))
+            else:
+                self.root.after(0, lambda: messagebox.showwarning("Install Failed", fail_text))
+        self.installs.submit_install(path, sig_path, do_self_test=True).add_done_callback(done)
+        gui_log(f"[Install] Queued {path}")
+
+    def _start_keygen_pool(self):
+        # started on the first "Generate RSA Keys" click, so one-off sign/verify
+        # launches never fork key generators; later clicks get a pre-generated pair
+        with self._keygen_lock:
+            if self.keygen is None:
+                from core.keygen_pool import KeyGenPool
+                self.keygen = KeyGenPool(bits=3072, inventory_size=2, workers=2).start()
+            return self.keygen
+
+    def _ensure_monitoring(self):
+        # NumPy (and scikit-learn, if a model is trained) load here, off the Tk thread
+        if self.service is None:
+            from core.monitor import TelemetryMonitor
+            from core.monitor_service import MonitorService
+            self.monitor = TelemetryMonitor()
+            self.service = MonitorService(log_callback=gui_log)
+            self.service.subscribe(self._on_monitor_event)
+        return self.service
+
     def _poll_log_queue(self):
-        try:
-            while True:
-                msg = log_queue.get_nowait()
-                self.console.insert(tk.END, msg + "\n")
-                self.console.see(tk.END)
-        except queue.Empty:
-            pass
+        # one widget insert per poll, then trim the scrollback
+        batch = log_pipeline.drain(max_items=MAX_CONSOLE_LINES)
+        if batch:
+            self.console.insert(tk.END, "\n".join(batch) + "\n")
+            excess = int(self.console.index("end-1c").split(".")[0]) - 1 - MAX_CONSOLE_LINES
+            if excess > 0:
+                self.console.delete("1.0", f"{excess + 1}.0")
+            self.console.see(tk.END)
         self.root.after(100, self._poll_log_queue)
 
     def handle_generate_keys(self):
+        threading.Thread(target=self._generate_keys_worker, daemon=True).start()
+
+    def _generate_keys_worker(self):
         try:
-            priv, pub = generate_keys("data/private.pem", "data/public.pem", bits=3072)
+            keygen = self._start_keygen_pool()
+            if not keygen.stats()["available"]:
+                gui_log("[INFO] Waiting for the next RSA key pair...")
+            priv, pub = keygen.take_to_files("data/private.pem", "data/public.pem", timeout=KEYGEN_TIMEOUT)
             gui_log("[INFO] RSA Keys generated.")
             expl = explain_keygen(priv, pub)
             gui_log(expl)
-            messagebox.showinfo("Keys Generated", f"Private: {priv}\nPublic: {pub}")
+            self.root.after(0, lambda: messagebox.showinfo("Keys Generated", f"Private: {priv}\nPublic: {pub}"))
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            err = str(e)
+            self.root.after(0, lambda: messagebox.showerror("Error", err))
             gui_log(f"[ERROR] Key generation failed: {e}")
 
     def handle_sign_bitstream(self):
@@ -139,6 +213,7 @@ class App:
         if not path:
             return
         try:
+            from core.signer import sign_file
             sig = sign_file(path, private_key_path="data/private.pem")
             gui_log(f"[OK] Signed: {path} -> {sig}")
             expl = explain_signing(path, sig)
@@ -154,43 +229,42 @@ class App:
             return
         sig_path = path + ".sig"
         if not os.path.exists(sig_path):
+            manifest = os.path.join(os.path.dirname(path), "bundle.json")
+            if os.path.exists(manifest + ".sig"):
+                self._install_from_bundle(path, manifest)
+                return
             messagebox.showwarning("Signature missing", f"No signature file found for {path}\nExpected: {sig_path}")
             return
-        ok, msg = verify_signature("data/public.pem", path, sig_path)
+        # shares the PRManager's verified cache, so install_and_validate won't re-verify
+        ok, msg = self.pr.trust_cache.verify("data/public.pem", path, sig_path)
         gui_log(f"[Verify] {msg}")
         gui_log(explain_verification(path, sig_path))
         if not ok:
             messagebox.showerror("Verification Failed", msg)
             return
-        # program and validate via PRManager
-        success = self.pr.install_and_validate(path, sig_path, do_self_test=True)
-        if success:
-            messagebox.showinfo("Success", "Bitstream verified and programmed successfully.")
-        else:
-            messagebox.showwarning("Install Failed", "Programming / self-test failed; check logs.")
+        # program and validate via PRManager, off the Tk thread
+        self._queue_install(path, sig_path, "Bitstream verified and programmed successfully.",
+                            "Programming / self-test failed; check logs.")
+
+    def _install_from_bundle(self, path, manifest):
+        # one RSA verification per manifest; members are then checked by hash
+        bundle = self.pr.bundle
+        if bundle is None or os.path.abspath(bundle.path) != os.path.abspath(manifest):
+            if not self.pr.load_bundle(manifest):
+                messagebox.showerror("Verification Failed", f"Bundle manifest {manifest} did not verify.")
+                return
+        self._queue_install(path, None, "Bitstream verified against bundle and programmed successfully.",
+                            "Bundle check / programming / self-test failed; check logs.")
 
     def handle_start_monitoring(self):
         if self.monitor_running:
             messagebox.showinfo("Monitoring", "Monitoring already running.")
             return
-        # prepare baseline by collecting telemetry from safe image
-        # ensure safe image exists; if not, create simple safe file
+        # preparing and programming the safe image and seeding the baseline run
+        # off the Tk thread; polling and scoring happen in the headless MonitorService
         safe_path = "data/safe_module.bit"
-        if not os.path.exists(safe_path):
-            with open(safe_path, "wb") as f:
-                f.write(b"SAFE_MODULE_V1" * 200)
-            gui_log(f"[Setup] Created demo safe image at {safe_path}")
-        # program safe image first
-        self.fpga.program_partial(safe_path, log_callback=gui_log)
-        # collect baseline samples
-        samples = []
-        for _ in range(120):
-            samples.append(self.fpga.get_telemetry())
-            time.sleep(0.01)
-        res = self.monitor.train_baseline(samples)
-        gui_log(f"[Monitor] {res}")
         self.monitor_running = True
-        self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self.monitor_thread = threading.Thread(target=self._run_monitoring, args=(safe_path,), daemon=True)
         self.monitor_thread.start()
         messagebox.showinfo("Monitoring", "Monitoring started; check console for alerts.")
 
@@ -198,35 +272,93 @@ class App:
         if not self.monitor_running:
             messagebox.showinfo("Monitoring", "Monitoring is not running.")
             return
-        self.monitor_running = False
+        self._finish_monitoring()
         messagebox.showinfo("Monitoring", "Monitoring stopped.")
 
-    def _monitor_loop(self):
+    def _prepare_safe_image(self, safe_path):
+        # only an image the demo writes itself is signed here; an existing
+        # unsigned image stays unsigned, so rollback refuses it
+        if not os.path.exists(safe_path):
+            with open(safe_path, "wb") as f:
+                f.write(b"SAFE_MODULE_V1" * 200)
+            gui_log(f"[Setup] Created demo safe image at {safe_path}")
+            if os.path.exists("data/private.pem"):
+                from core.signer import sign_file
+                try:
+                    gui_log(f"[Setup] Signed demo safe image -> {sign_file(safe_path, private_key_path='data/private.pem')}")
+                except Exception as e:
+                    gui_log(f"[Setup] Could not sign demo safe image: {e}")
+        if not os.path.exists(safe_path + ".sig") and not (self.pr.bundle and safe_path in self.pr.bundle):
+            gui_log(f"[Setup] WARNING: {safe_path} is not signed, so rollback will be refused. "
+                    "Sign it with \"Sign Bitstream\" first.")
+
+    def _run_monitoring(self, safe_path):
+        self._ensure_monitoring()
+        self._prepare_safe_image(safe_path)
+        # program safe image first, and stage a second copy for fast rollback
+        with self.pr.lock:
+            self.fpga.program_partial(safe_path, log_callback=gui_log)
+            self.pr.prestage_safe_image()
+        # warm-start from the stored baseline; otherwise seed an online baseline
+        # from a quick burst. Either way it keeps adapting while monitoring.
+        seed = [self.fpga.get_telemetry() for _ in range(30)]
+        try:
+            res = self.monitor.load_baseline(BASELINE_PATH, expected_keys=seed[0].keys())
+        except FileNotFoundError:
+            res = self.monitor.start_online(seed[0].keys(), decay=0.02, samples=seed)
+        except Exception as e:
+            # wrong version / key order or a corrupt file: say so, then relearn
+            gui_log(f"[Monitor] Stored baseline rejected: {e}")
+            res = self.monitor.start_online(seed[0].keys(), decay=0.02, samples=seed)
+        gui_log(f"[Monitor] {res}")
+        if not self.monitor_running:
+            return
         gui_log("[Monitor] Entering monitoring loop...")
-        inject_at = time.time() + 8  # will inject anomaly at 8s for demo
-        injected = False
-        while self.monitor_running:
-            t = self.fpga.get_telemetry()
-            is_anom = self.monitor.is_anomaly(t)
-            gui_log(f"[Monitor] Telemetry: {t} Anomaly: {is_anom}")
-            if is_anom:
-                gui_log("[Monitor] Anomaly detected -> Triggering rollback to safe image.")
-                self.pr.rollback()
-                # stop monitoring after recovery for demo
-                self.monitor_running = False
-                break
-            # demo: inject bad module after some time
-            if not injected and time.time() > inject_at:
-                bad_path = "data/bad_module.bit"
-                with open(bad_path, "wb") as f:
-                    f.write(b"BAD_MODULE_V1" * 200)
-                gui_log("[Demo] Injecting bad module to simulate attack/fault.")
+        # rollbacks go through the install queue's priority lane
+        self.service.add_device("fpga0", self.fpga, self.installs, monitor=self.monitor, interval=1.0)
+        self.service.start()
+        # demo: inject bad module after some time
+        inject_at = time.time() + 8
+        while self.monitor_running and time.time() < inject_at:
+            time.sleep(0.2)
+        if self.monitor_running:
+            bad_path = "data/bad_module.bit"
+            with open(bad_path, "wb") as f:
+                f.write(b"BAD_MODULE_V1" * 200)
+            gui_log("[Demo] Injecting bad module to simulate attack/fault.")
+            with self.pr.lock:
                 self.fpga.program_partial(bad_path, log_callback=gui_log)
-                injected = True
-            time.sleep(1.0)
+
+    def _on_monitor_event(self, event):
+        # MonitorService subscriber; runs on the service threads
+        if event["type"] == "telemetry":
+            gui_log(f"[Monitor] Telemetry: {event['telemetry']} Anomaly: {event['anomaly']}")
+        elif event["type"] == "anomaly":
+            gui_log("[Monitor] Anomaly detected -> Triggering rollback to safe image.")
+        elif event["type"] == "rollback":
+            # stop monitoring after recovery for demo
+            self._finish_monitoring()
+
+    def _finish_monitoring(self):
+        with self._monitor_lock:
+            if not self.monitor_running:
+                return
+            self.monitor_running = False
+        if self.service is None:
+            return
+        self.service.stop()
+        self.service.remove_device("fpga0")
+        try:
+            self.monitor.save_baseline(BASELINE_PATH)
+        except Exception as e:
+            gui_log(f"[Monitor] Could not save baseline: {e}")
         gui_log("[Monitor] Monitoring loop exited.")
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = App(root)
     root.mainloop()
+    if app.keygen is not None:
+        app.keygen.shutdown(wait=False)
+    if app._installs is not None:
+        app._installs.shutdown(wait=False)
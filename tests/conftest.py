@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from core.rsa_engine import generate_keys
+from core.signer import sign_file
+
+
+@pytest.fixture(scope="session")
+def keys(tmp_path_factory):
+    d = tmp_path_factory.mktemp("keys")
+    return generate_keys(str(d / "private.pem"), str(d / "public.pem"), bits=2048)
+
+
+@pytest.fixture
+def signed_bitstream(tmp_path, keys):
+    path = str(tmp_path / "module.bit")
+    with open(path, "wb") as f:
+        f.write(os.urandom(64 * 1024))
+    return path, sign_file(path, private_key_path=keys[0])
+
+
+def tamper_in_place(path, offset=100, data=b"\x00\xff\x00\xff"):
+    """Rewrite bytes without changing size or inode, then restore the mtime."""
+    st = os.stat(path)
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
@@ -0,0 +1,42 @@
+import os
+
+from conftest import tamper_in_place
+from core.bundle import SignedBundle, sign_bundle
+
+
+def _release(tmp_path, keys, n=3):
+    paths = []
+    for i in range(n):
+        path = str(tmp_path / f"m{i}.bit")
+        with open(path, "wb") as f:
+            f.write(os.urandom(8 * 1024))
+        paths.append(path)
+    manifest, _ = sign_bundle(paths, str(tmp_path / "bundle.json"), private_key_path=keys[0])
+    return paths, manifest
+
+
+def test_members_check_against_signed_manifest(tmp_path, keys):
+    paths, manifest = _release(tmp_path, keys)
+    bundle, msg = SignedBundle.load(manifest, public_key_path=keys[1])
+    assert bundle is not None, msg
+    assert all(ok for _, ok, _ in bundle.check_all())
+    assert str(tmp_path / "other.bit") not in bundle
+
+
+def test_in_place_member_tamper_with_restored_mtime_is_rejected(tmp_path, keys):
+    paths, manifest = _release(tmp_path, keys)
+    bundle, _ = SignedBundle.load(manifest, public_key_path=keys[1])
+    assert bundle.check_member(paths[0])[0]
+    tamper_in_place(paths[0])
+    ok, msg = bundle.check_member(paths[0])
+    assert not ok, msg
+
+
+def test_edited_manifest_is_rejected(tmp_path, keys):
+    paths, manifest = _release(tmp_path, keys)
+    with open(manifest) as f:
+        text = f.read()
+    with open(manifest, "w") as f:
+        f.write(text.replace('"size": 8192', '"size": 8193', 1))
+    bundle, msg = SignedBundle.load(manifest, public_key_path=keys[1])
+    assert bundle is None
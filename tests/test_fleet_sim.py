@@ -0,0 +1,35 @@
+import random
+
+from core.fleet_sim import FleetSimulation
+from core.signer import sign_file
+
+
+def _scenario(tmp_path, keys, seed):
+    # same shape as `python -m core.fleet_sim`, scaled down
+    tmp_path.mkdir()
+    rng = random.Random(f"{seed}/images")
+    safe, update, bad = (tmp_path / "safe.bit", tmp_path / "v2.bit", tmp_path / "bad_module.bit")
+    safe.write_bytes(rng.randbytes(16 * 1024))
+    update.write_bytes(rng.randbytes(16 * 1024))
+    bad.write_bytes(b"BAD_MODULE_V1" * 1000)
+    sign_file(str(safe), private_key_path=keys[0])
+    sign_file(str(update), private_key_path=keys[0])
+    sim = FleetSimulation(20, str(safe), public_key_path=keys[1], seed=seed, poll_interval=5.0)
+    sim.bring_up()
+    sim.start_monitoring(0.0)
+    sim.rollout(str(update), start=60.0, window=120.0)
+    sim.inject_random(str(bad), 3, 60.0, 400.0)
+    summary = sim.run(600.0)
+    for wall_clock in ("wall_seconds", "speedup"):
+        summary.pop(wall_clock)
+    return summary
+
+
+def test_same_seed_gives_identical_summaries(tmp_path, keys):
+    first = _scenario(tmp_path / "a", keys, seed=7)
+    assert first["rollbacks"] > 0 and first["installs"] == 20
+    assert _scenario(tmp_path / "b", keys, seed=7) == first
+
+
+def test_different_seed_gives_different_summary(tmp_path, keys):
+    assert _scenario(tmp_path / "a", keys, seed=7) != _scenario(tmp_path / "b", keys, seed=8)
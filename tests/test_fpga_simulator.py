@@ -0,0 +1,55 @@
+import pytest
+
+from core.fpga_simulator import FPGASimulator, FRAME_SIZE, PROGRAM_SETUP_TIME
+
+# a full-region reload takes between 1.0 and 1.8 simulated seconds
+MAX_RELOAD = 1.8
+
+
+def _image(path, frames, seed=0, patch=()):
+    data = bytearray((seed + i) % 251 for i in range(frames * FRAME_SIZE))
+    for frame in patch:
+        data[frame * FRAME_SIZE + 7] ^= 0xff
+    path.write_bytes(bytes(data))
+    return str(path)
+
+
+@pytest.fixture
+def fpga():
+    return FPGASimulator(time_scale=0, seed=1)
+
+
+def _program(fpga, path):
+    before = fpga.busy_seconds
+    assert fpga.program_partial(path, log_callback=lambda msg: None)
+    return fpga.busy_seconds - before
+
+
+def test_delta_writes_only_changed_frames(tmp_path, fpga):
+    base = _image(tmp_path / "a.bit", 200)
+    update = _image(tmp_path / "b.bit", 200, patch=(3, 10, 199))
+    _program(fpga, base)
+    assert fpga.last_changed_frames == list(range(200))
+    _program(fpga, update)
+    assert fpga.last_changed_frames == [3, 10, 199]
+    _program(fpga, update)
+    assert fpga.last_changed_frames == []
+
+
+def test_frames_past_a_shorter_image_are_cleared(tmp_path, fpga):
+    _program(fpga, _image(tmp_path / "big.bit", 300))
+    _program(fpga, _image(tmp_path / "small.bit", 20))
+    assert fpga.last_changed_frames == list(range(20, 300))
+
+
+def test_busy_time_scales_with_changed_frames(tmp_path, fpga):
+    base = _image(tmp_path / "a.bit", 1000)
+    assert _program(fpga, base) <= PROGRAM_SETUP_TIME + MAX_RELOAD
+    assert _program(fpga, _image(tmp_path / "b.bit", 1000, patch=(5, 6))) <= PROGRAM_SETUP_TIME + MAX_RELOAD * 2 / 1000
+    assert _program(fpga, _image(tmp_path / "c.bit", 1000, patch=(5, 6))) == pytest.approx(PROGRAM_SETUP_TIME)
+
+
+def test_shrinking_image_costs_at_most_a_full_reload(tmp_path, fpga):
+    # clearing the frames past a short image is charged at the region's per-frame rate
+    _program(fpga, _image(tmp_path / "big.bit", 5000))
+    assert _program(fpga, _image(tmp_path / "small.bit", 10)) <= PROGRAM_SETUP_TIME + MAX_RELOAD
@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from core.install_queue import InstallQueue
+
+
+class _FPGA:
+    pr_region = "test/PR0"
+
+    def now(self):
+        return 0.0
+
+
+class _PR:
+    """Records calls; the first call blocks until release() so requests can pile up behind it."""
+    def __init__(self):
+        self.fpga = _FPGA()
+        self.log = lambda msg: None
+        self.calls = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def install_and_validate(self, path, sig_path=None, do_self_test=True):
+        return self._call(("install", path))
+
+    def rollback(self, fast=True, detected_at=None):
+        return self._call(("rollback", fast))
+
+    def _call(self, call):
+        self.calls.append(call)
+        self.started.set()
+        assert self.gate.wait(5)
+        return True
+
+
+@pytest.fixture
+def busy_queue():
+    # the queue is busy running "first.bit" until pr.gate is set
+    pr = _PR()
+    queue = InstallQueue(pr)
+    first = queue.submit_install("first.bit")
+    assert pr.started.wait(5)
+    yield queue, pr, first
+    pr.gate.set()
+    queue.shutdown()
+
+
+def test_rollback_runs_before_pending_install(busy_queue):
+    queue, pr, first = busy_queue
+    install = queue.submit_install("second.bit")
+    rollback = queue.submit_rollback(fast=False)
+    assert queue.submit_rollback() is rollback
+    pr.gate.set()
+    assert first.result(5) and rollback.result(5) and install.result(5)
+    assert pr.calls == [("install", "first.bit"), ("rollback", False), ("install", "second.bit")]
+
+
+def test_newer_install_supersedes_pending_one(busy_queue):
+    queue, pr, first = busy_queue
+    old = queue.submit_install("old.bit")
+    new = queue.submit_install("new.bit")
+    assert old.cancelled()
+    assert queue.pending()["install"] == "new.bit"
+    pr.gate.set()
+    assert new.result(5)
+    assert pr.calls == [("install", "first.bit"), ("install", "new.bit")]
+    assert queue.stats()["superseded"] == 1
+
+
+def test_cancel_pending_leaves_running_request(busy_queue):
+    queue, pr, first = busy_queue
+    install = queue.submit_install("second.bit")
+    rollback = queue.submit_rollback()
+    assert queue.cancel_pending() == 2
+    assert queue.pending() == {"install": None, "rollback": False, "running": True}
+    pr.gate.set()
+    assert first.result(5)
+    with pytest.raises(CancelledError):
+        install.result(0)
+    assert rollback.cancelled()
+    queue.shutdown()
+    assert pr.calls == [("install", "first.bit")]
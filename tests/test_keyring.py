@@ -0,0 +1,33 @@
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from core.keyring import KeyRing
+
+
+@pytest.fixture
+def encrypted_key(tmp_path):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=1024)
+    path = tmp_path / "private.pem"
+    path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                       serialization.BestAvailableEncryption(b"secret")))
+    return str(path)
+
+
+def test_cached_private_key_needs_the_same_password(encrypted_key):
+    ring = KeyRing()
+    key = ring.private_key(encrypted_key, password=b"secret")
+    assert ring.private_key(encrypted_key, password=b"secret") is key
+    assert ring.hits == 1
+    with pytest.raises(ValueError):
+        ring.private_key(encrypted_key, password=b"wrong")
+    with pytest.raises(TypeError):
+        ring.private_key(encrypted_key)
+
+
+def test_invalidate_drops_every_cached_password(encrypted_key):
+    ring = KeyRing()
+    ring.private_key(encrypted_key, password=b"secret")
+    ring.invalidate(encrypted_key)
+    ring.private_key(encrypted_key, password=b"secret")
+    assert ring.misses == 2
@@ -0,0 +1,27 @@
+from core.log_pipeline import LogPipeline
+
+
+def test_consecutive_duplicates_are_folded():
+    log = LogPipeline()
+    for _ in range(4):
+        log.put("same")
+    log.put("other")
+    assert log.drain() == ["same", "same (repeated 3 times)", "other"]
+
+
+def test_repeats_of_a_rate_limited_line_are_not_reported_as_shown():
+    log = LogPipeline(rate_limit=1)
+    log.put("first")
+    for _ in range(5):
+        log.put("flood")  # no tokens left: dropped
+    out = log.drain()
+    assert out[0] == "[Log] 5 message(s) dropped (backpressure)"
+    assert out[1:] == ["first"]
+    assert not any("flood" in line for line in out)
+
+
+def test_oldest_line_is_dropped_when_full():
+    log = LogPipeline(capacity=2)
+    for line in ("a", "b", "c"):
+        log.put(line)
+    assert log.drain() == ["[Log] 1 message(s) dropped (backpressure)", "b", "c"]
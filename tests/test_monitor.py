@@ -0,0 +1,47 @@
+import numpy as np
+
+from core.fpga_simulator import FPGASimulator
+from core.monitor import OnlineBaseline, TelemetryMonitor
+
+KEYS = ["cpu", "errors", "packet_rate"]
+
+
+def test_update_batch_matches_per_row_updates():
+    X = np.random.default_rng(0).normal(5.0, 2.0, size=(500, len(KEYS)))
+    batched, rowwise = OnlineBaseline(KEYS), OnlineBaseline(KEYS)
+    batched.update_batch(X[:7])
+    batched.update_batch(X[7:])
+    for row in X:
+        rowwise.update(row)
+    assert batched.n == rowwise.n == len(X)
+    assert np.allclose(batched.mean, rowwise.mean)
+    assert np.allclose(batched.var, X.var(axis=0))
+
+
+def test_update_batch_keeps_order_for_windowed_baselines():
+    X = np.arange(30, dtype=float).reshape(10, len(KEYS))
+    b = OnlineBaseline(KEYS, window=4)
+    b.update_batch(X)
+    assert b.n == 4
+    assert np.allclose(b.mean, X[-4:].mean(axis=0))
+
+
+def test_decayed_baseline_seed_matches_plain_statistics():
+    X = np.random.default_rng(1).normal(5.0, 2.0, size=(30, len(KEYS)))
+    decayed, plain = OnlineBaseline(KEYS, decay=0.02), OnlineBaseline(KEYS)
+    decayed.update_batch(X)
+    plain.update_batch(X)
+    assert np.allclose(decayed.mean, plain.mean)
+    assert np.allclose(decayed.var, plain.var)
+
+
+def test_decayed_seed_raises_no_false_anomalies():
+    # the GUI seeds a decay=0.02 baseline with 30 samples, then polls
+    false_alarms = 0
+    for seed in range(200):
+        fpga = FPGASimulator(seed=seed, time_scale=0)
+        samples = [fpga.get_telemetry() for _ in range(30)]
+        monitor = TelemetryMonitor()
+        monitor.start_online(samples[0].keys(), decay=0.02, samples=samples)
+        false_alarms += sum(monitor.observe(fpga.get_telemetry()) for _ in range(8))
+    assert false_alarms == 0
@@ -0,0 +1,84 @@
+import os
+import time
+
+from conftest import tamper_in_place
+from core.fpga_simulator import FPGASimulator
+from core.pr_manager import PRManager
+from core.signer import sign_file
+from core.trust_cache import VerifiedCache
+
+
+def _manager(safe_image, keys, **kwargs):
+    fpga = FPGASimulator(time_scale=0, seed=1)
+    return PRManager(fpga, public_key_path=keys[1], safe_image=safe_image, log_callback=lambda msg: None,
+                     trust_cache=VerifiedCache(path=None), **kwargs)
+
+
+def _image(tmp_path, name, data=b"SAFE_MODULE_V1" * 200):
+    path = str(tmp_path / name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_unsigned_safe_image_is_refused_by_default(tmp_path, keys):
+    pr = _manager(_image(tmp_path, "safe.bit"), keys)
+    assert not pr.prestage_safe_image()
+    assert not pr.rollback()
+
+
+def test_unsigned_safe_image_needs_explicit_opt_in(tmp_path, keys):
+    pr = _manager(_image(tmp_path, "safe.bit"), keys, allow_unsigned_safe_image=True)
+    assert pr.rollback(fast=False)
+    assert pr.fpga.current_image == pr.safe_image
+
+
+def test_signed_safe_image_rolls_back(tmp_path, keys):
+    safe = _image(tmp_path, "safe.bit")
+    sign_file(safe, private_key_path=keys[0])
+    pr = _manager(safe, keys)
+    assert pr.prestage_safe_image()
+    assert pr.rollback()
+    assert pr.fpga.current_image == safe
+
+
+def test_fast_rollback_restages_after_deferred_checks(tmp_path, keys):
+    safe = _image(tmp_path, "safe.bit")
+    sign_file(safe, private_key_path=keys[0])
+    pr = _manager(safe, keys, background_restage=False)
+    assert pr.prestage_safe_image()
+    assert pr.rollback()
+    assert pr.last_recovery_seconds is not None
+    assert pr.fpga.shadow_image() == safe
+
+
+def test_safe_image_tampered_after_prestage_fails_rollback(tmp_path, keys):
+    safe = _image(tmp_path, "safe.bit")
+    sign_file(safe, private_key_path=keys[0])
+    pr = _manager(safe, keys, background_restage=False)
+    assert pr.prestage_safe_image()
+    tamper_in_place(safe)
+    assert pr.fpga.shadow_image() == safe  # the stat check alone cannot tell
+    assert not pr.rollback()
+    assert pr.last_recovery_seconds is None
+
+
+def test_background_readback_invalidates_tampered_recovery(tmp_path, keys):
+    safe = _image(tmp_path, "safe.bit")
+    sign_file(safe, private_key_path=keys[0])
+    pr = _manager(safe, keys)
+    assert pr.prestage_safe_image()
+    tamper_in_place(safe)
+    assert pr.rollback()
+    deadline = time.monotonic() + 5
+    while pr.last_recovery_seconds is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with pr.lock:
+        assert pr.last_recovery_seconds is None
+        assert pr.fpga.shadow_image() is None
+
+
+def test_deleting_safe_image_signature_disables_rollback(tmp_path, keys):
+    safe = _image(tmp_path, "safe.bit")
+    os.remove(sign_file(safe, private_key_path=keys[0]))
+    assert not _manager(safe, keys).rollback(fast=False)
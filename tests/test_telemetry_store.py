@@ -0,0 +1,26 @@
+import numpy as np
+
+from core.telemetry_store import TelemetryRing
+
+
+def _ring(values, capacity=4):
+    ring = TelemetryRing(["cpu"], capacity=capacity)
+    for t, v in enumerate(values):
+        ring.append({"cpu": v}, t=float(t))
+    return ring
+
+
+def test_window_is_latest_samples_oldest_first():
+    ring = _ring(range(10))
+    assert ring.window("cpu").tolist() == [6, 7, 8, 9]
+    assert ring.window("cpu", n=2).tolist() == [8, 9]
+    assert ring.window("time", seconds=1).tolist() == [8.0, 9.0]
+
+
+def test_view_aliases_ring_but_copy_is_stable():
+    ring = _ring(range(4))
+    view, snapshot = ring.window("cpu"), ring.window("cpu", copy=True)
+    ring.append({"cpu": 99}, t=4.0)
+    assert view.tolist() == [99, 1, 2, 3]  # the oldest slot was overwritten in place
+    assert snapshot.tolist() == [0, 1, 2, 3]
+    assert np.shares_memory(view, ring.window("cpu", n=3))
@@ -0,0 +1,57 @@
+import hashlib
+import json
+
+import pytest
+
+from conftest import tamper_in_place
+from core.keyring import load_public_key
+from core.trust_cache import VerifiedCache, key_fingerprint
+
+
+def test_repeat_verification_is_cached(keys, signed_bitstream):
+    path, sig = signed_bitstream
+    cache = VerifiedCache(path=None)
+    assert cache.verify(keys[1], path, sig) == (True, "Signature valid.")
+    assert cache.verify(keys[1], path, sig) == (True, "Signature valid (cached).")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_in_place_tamper_with_restored_mtime_is_rejected(keys, signed_bitstream):
+    path, sig = signed_bitstream
+    cache = VerifiedCache(path=None)
+    assert cache.verify(keys[1], path, sig)[0]
+    tamper_in_place(path)
+    ok, msg = cache.verify(keys[1], path, sig)
+    assert not ok, msg
+
+
+def test_persisted_cache_is_reused(tmp_path, keys, signed_bitstream):
+    path, sig = signed_bitstream
+    store = str(tmp_path / "cache.json")
+    VerifiedCache(path=store, secret=b"k").verify(keys[1], path, sig)
+    assert VerifiedCache(path=store, secret=b"k").verify(keys[1], path, sig) == (True, "Signature valid (cached).")
+
+
+def test_persisting_needs_a_secret(tmp_path):
+    with pytest.raises(ValueError):
+        VerifiedCache(path=str(tmp_path / "cache.json"))
+
+
+def test_forged_cache_entry_is_not_trusted(tmp_path, keys, signed_bitstream):
+    path, sig = signed_bitstream
+    store = tmp_path / "cache.json"
+    VerifiedCache(path=str(store), secret=b"k").verify(keys[1], path, sig)
+    evil = tmp_path / "evil.bit"
+    evil.write_bytes(b"EVIL" * 1000)
+    evil_sig = tmp_path / "evil.bit.sig"
+    evil_sig.write_bytes(b"not a signature")
+    forged = (f"{hashlib.sha256(evil.read_bytes()).hexdigest()}:{hashlib.sha256(b'not a signature').hexdigest()}:"
+              f"{key_fingerprint(load_public_key(keys[1]))}")
+    data = json.loads(store.read_text())
+    data["entries"].append([forged, str(evil)])
+    store.write_text(json.dumps(data))
+    cache = VerifiedCache(path=str(store), secret=b"k")
+    assert len(cache) == 0
+    ok, msg = cache.verify(keys[1], str(evil), str(evil_sig))
+    assert not ok, msg
+    assert VerifiedCache(path=str(store), secret=b"other").verify(keys[1], path, sig) == (True, "Signature valid.")